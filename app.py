@@ -1,28 +1,37 @@
+import time
+_imports_started = time.perf_counter()
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import plotly.express as px
-from datetime import datetime
-import base64
+import numpy as np
 import os
-import requests
-import google.generativeai as genai
 from dotenv import load_dotenv
-from PIL import Image
-import random
-import re
+import sqlite3
+from corpus import CombinedCorpus, ResultSet, get_corpus, update_cell
+from corpus_edits import get_edit_store, sheet_sync_available, sheet_writer, sync_edits
+from facets import NOTATOR, RAGA, TALA, filter_ids, get_facet_table, has_link, missing_link_ids, option_label, update_link
+from lyrics_index import load_lyrics_index
+from lyricists import get_registry, load_combined, load_errors
+# The Gemini SDK and requests are imported by the generation backends on first use
+from generation_client import get_generation_client, uses_gemini
+from poem_validation import check_poem, validation_stats
+from response_cache import CACHE_MAX_TEMPERATURE
+from retrieval import pack_references, retrieve_reference_ids
+from semantic_index import load_semantic_index
+import startup
+import warmup
+from rhyme_index import load_suffix_index
+
+startup.record_import_time(time.perf_counter() - _imports_started)
 
 # Load environment variables
 load_dotenv()
 
-# Set favicon to tagoreV1.png for page config
-favicon_path = os.path.join("static", "tagoreV1.png")
-favicon_img = None
-if os.path.exists(favicon_path):
-    favicon_img = Image.open(favicon_path)
-
+# Set favicon to tagoreV1.png for page config, opened once per process
 st.set_page_config(
     page_title="RabindraGPT - Bengali Poetry & Music Generator",
-    page_icon=favicon_img if favicon_img else "🎵",
+    page_icon=startup.page_icon(os.path.join("static", "tagoreV1.png"), "🎵"),
     layout="wide",
     initial_sidebar_state="expanded"
 )
@@ -57,281 +66,192 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
+if not GEMINI_API_KEY and uses_gemini():
     st.error("GEMINI_API_KEY not found in environment variables. Please create a .env file with your API key.")
     st.stop()
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Load every corpus and index in the background as soon as the process starts
+warmup.start_warmup()
 
-def load_tagore_songs_data():
-    """Load Rabindranath Tagore's songs data from pickle file or Google Drive if pickle doesn't exist"""
-    pickle_path = "songs/tagore.pkl"
-    
-    # Try to load from pickle first
-    if os.path.exists(pickle_path):
-        try:
-            df = pd.read_pickle(pickle_path)
-            return df
-        except Exception as e:
-            st.warning(f"Could not load from pickle: {e}")
-    
-    # If pickle doesn't exist or fails, load from Google Drive and create pickle
-    try:
-        sheet_id = "14usErsJJZU82Thx1Jl4D93cTPyN0ea8Mq7nsYzgtZP4"
-        gid = "0"  # Tagore sheet gid
-        
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-        
-        df = pd.read_csv(csv_url)
-        
-        # Save to pickle for future use
-        try:
-            os.makedirs("songs", exist_ok=True)
-            df.to_pickle(pickle_path)
-            st.success("✅ Tagore songs data loaded from Google Drive and saved locally")
-        except Exception as e:
-            st.warning(f"Could not save pickle: {e}")
-        
-        return df
-    except Exception as e:
-        st.error(f"Could not load Tagore songs from Google Drive: {e}")
-        return pd.DataFrame()
+def wait_for(artifact):
+    """Block until the warm-up has loaded an artifact, with a spinner if it is still loading"""
+    if not warmup.ready(artifact):
+        with st.spinner(f"Loading the {artifact}..."):
+            warmup.wait(artifact)
 
-def load_dwijendralal_songs_data():
-    """Load Dwijendralal Ray's songs data from Google Drive"""
-    pickle_path = "songs/dwijendralal.pkl"
-    
-    # Try to load from pickle first
-    if os.path.exists(pickle_path):
-        try:
-            df = pd.read_pickle(pickle_path)
-            return df
-        except Exception as e:
-            st.warning(f"Could not load from pickle: {e}")
-    
-    # If pickle doesn't exist or fails, load from Google Drive and create pickle
-    try:
-        sheet_id = "14usErsJJZU82Thx1Jl4D93cTPyN0ea8Mq7nsYzgtZP4"
-        gid = "491922462"  # Dwijendralal Ray sheet gid
-        
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-        
-        df = pd.read_csv(csv_url)
-        
-        # Save to pickle for future use
-        try:
-            os.makedirs("songs", exist_ok=True)
-            df.to_pickle(pickle_path)
-            st.success("✅ Dwijendralal Ray songs data loaded from Google Drive and saved locally")
-        except Exception as e:
-            st.warning(f"Could not save pickle: {e}")
-        
-        return df
-    except Exception as e:
-        st.error(f"Could not load Dwijendralal Ray songs from Google Drive: {e}")
-        return pd.DataFrame()
+CORPUS_MISSING = "Run `python build_corpus.py` on the server to build the song data."
 
-def load_atulprasad_songs_data():
-    """Load Atulprasad Sen's songs data from Google Drive"""
-    pickle_path = "songs/atulprasad.pkl"
-    
-    # Try to load from pickle first
-    if os.path.exists(pickle_path):
-        try:
-            df = pd.read_pickle(pickle_path)
-            return df
-        except Exception as e:
-            st.warning(f"Could not load from pickle: {e}")
-    
-    # If pickle doesn't exist or fails, load from Google Drive and create pickle
+def load_prebuilt_corpus(pickle_path, label):
+    """Load a corpus written by build_corpus.py; nothing is fetched or written at request time"""
     try:
-        sheet_id = "14usErsJJZU82Thx1Jl4D93cTPyN0ea8Mq7nsYzgtZP4"
-        gid = "1890029073"  # Atulprasad Sen sheet gid
-        
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-        
-        df = pd.read_csv(csv_url)
-        
-        # Save to pickle for future use
-        try:
-            os.makedirs("songs", exist_ok=True)
-            df.to_pickle(pickle_path)
-            st.success("✅ Atulprasad Sen songs data loaded from Google Drive and saved locally")
-        except Exception as e:
-            st.warning(f"Could not save pickle: {e}")
-        
-        return df
+        return get_corpus(pickle_path)
     except Exception as e:
-        st.error(f"Could not load Atulprasad Sen songs from Google Drive: {e}")
+        st.error(f"Could not load {label}: {e}. {CORPUS_MISSING}")
         return pd.DataFrame()
 
-def load_combined_songs_data(selected_lyricist):
-    """Load songs data based on selected lyricist"""
-    if selected_lyricist == "All":
-        # Load all lyricists' data
-        tagore_df = load_tagore_songs_data()
-        dwijendralal_df = load_dwijendralal_songs_data()
-        atulprasad_df = load_atulprasad_songs_data()
-        
-        # Add lyricist column to each dataframe
-        if not tagore_df.empty:
-            tagore_df['lyricist'] = 'Rabindranath Tagore'
-        if not dwijendralal_df.empty:
-            dwijendralal_df['lyricist'] = 'Dwijendralal Ray'
-        if not atulprasad_df.empty:
-            atulprasad_df['lyricist'] = 'Atulprasad Sen'
-        
-        # Combine all dataframes
-        dataframes = []
-        if not tagore_df.empty:
-            dataframes.append(tagore_df)
-        if not dwijendralal_df.empty:
-            dataframes.append(dwijendralal_df)
-        if not atulprasad_df.empty:
-            dataframes.append(atulprasad_df)
-        
-        if dataframes:
-            combined_df = pd.concat(dataframes, ignore_index=True)
-            return combined_df
-        else:
-            return pd.DataFrame()
-    elif selected_lyricist == "Rabindranath Tagore":
-        df = load_tagore_songs_data()
-        if not df.empty:
-            df['lyricist'] = 'Rabindranath Tagore'
-        return df
-    elif selected_lyricist == "Dwijendralal Ray":
-        df = load_dwijendralal_songs_data()
-        if not df.empty:
-            df['lyricist'] = 'Dwijendralal Ray'
-        return df
-    elif selected_lyricist == "Atulprasad Sen":
-        df = load_atulprasad_songs_data()
-        if not df.empty:
-            df['lyricist'] = 'Atulprasad Sen'
-        return df
-    else:
-        # For other lyricists, return empty dataframe for now
-        return pd.DataFrame()
+# Modes that show or search songs; the others never touch the combined corpus
+CORPUS_MODES = ("search_poetry", "search_music", "generate")
 
-def load_dictionary_data():
-    """Load dictionary data for suffix matching with on-disk caching.
+def load_combined_corpus():
+    """Shared corpus of every registered lyricist's songs, built once and reused by all sessions.
 
-    Behavior:
-    - On first run (no pickle yet): load from Google Sheets, keep only the first
-      occurrence of each unique token, compute token_length, pickle to disk, and
-      return the processed DataFrame.
-    - On subsequent runs: load directly from the pickle for fast startup.
+    Called once per rerun by main(), which passes the result down, so the
+    messages about missing lyricists are shown once.
     """
-    pickle_path = "songs/dictionary.pkl"
-
-    # Try to load from pickle first
-    if os.path.exists(pickle_path):
-        try:
-            cached_df = pd.read_pickle(pickle_path)
-            return cached_df
-        except Exception as e:
-            st.warning(f"Could not load dictionary cache from pickle: {e}")
-
-    # Fallback: load from Google Sheets, process, and cache
+    wait_for(warmup.CORPORA)
+    registry = get_registry()
     try:
-        sheet_id = "1WCkGF8wzS3YVACJC9YleFHEkx5K0XGmFja4xteFs2hw"
-        csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        raw_df = pd.read_csv(csv_url)
+        combined = load_combined(registry)
+    except Exception as e:
+        st.error(f"Could not load songs: {e}. {CORPUS_MISSING}")
+        return CombinedCorpus(pd.DataFrame(), {})
+    missing = [lyricist for lyricist in registry.with_songs() if lyricist.name not in combined.ranges]
+    if missing:
+        errors = load_errors()
+        details = [
+            f"{lyricist.name} ({errors[lyricist.source.corpus]})" if lyricist.source.corpus in errors else lyricist.name
+            for lyricist in missing
+        ]
+        st.warning(f"No song data found for {', '.join(details)}. {CORPUS_MISSING}")
+    return combined
 
-        # Normalize and keep first occurrence of each unique token
-        if 'token' not in raw_df.columns:
-            st.error("Dictionary sheet must contain a 'token' column.")
-            return pd.DataFrame()
+def lyricist_doc_range(combined, selected_lyricist):
+    """[start, stop) rows of one lyricist in the combined corpus, or None for everyone"""
+    return None if selected_lyricist == "All" else combined.ranges.get(selected_lyricist, (0, 0))
 
-        # Clean token values
-        processed_df = raw_df.copy()
-        processed_df['token'] = processed_df['token'].astype(str).str.strip()
+def search_lyrics_ids(combined, keyword, selected_lyricist="All"):
+    """Combined-corpus IDs of the songs matching the keyword query (AND by default, OR between groups), best BM25 match first"""
+    if combined.frame.empty:
+        return np.zeros(0, dtype=np.int64)
+    wait_for(warmup.LYRICS_INDEX)
+    return load_lyrics_index(combined).search(keyword, lyricist_doc_range(combined, selected_lyricist))
 
-        # Drop rows with empty or invalid tokens
-        processed_df = processed_df[(processed_df['token'] != '') & (processed_df['token'].str.lower() != 'nan')]
+SEARCH_AGAIN = "The song collection was updated since your last search. Please search again."
 
-        # Keep first occurrence per unique token
-        processed_df = processed_df.drop_duplicates(subset=['token'], keep='first')
+SEMANTIC_INDEX_MISSING = "Search by meaning is not available yet: the song embeddings have not been built. Run `python semantic_index.py` on the server."
 
-        # Ensure token_length exists and is correct
-        processed_df['token_length'] = processed_df['token'].apply(lambda x: len(str(x)))
+def search_lyrics_ids_by_meaning(combined, query, selected_lyricist="All", top_k=50):
+    """Combined-corpus IDs of the songs closest in meaning to the query, or None without a semantic index"""
+    wait_for(warmup.SEMANTIC_INDEX)
+    semantic_index = load_semantic_index(combined)
+    if semantic_index is None:
+        return None
+    return semantic_index.search(query, top_k=top_k, doc_range=lyricist_doc_range(combined, selected_lyricist))
 
-        # Persist cache
-        try:
-            os.makedirs("songs", exist_ok=True)
-            processed_df.to_pickle(pickle_path)
-            st.success("✅ Dictionary loaded from Google Sheet and cached for faster searches")
-        except Exception as e:
-            st.warning(f"Could not save dictionary pickle: {e}")
+def retrieve_reference_lyrics(combined, theme, raga, tala, k=3, max_tokens=1500):
+    """Lyrics of the k Tagore songs closest to the theme, raga and tala, packed to fit the prompt budget"""
+    if combined.frame.empty:
+        return ""
+    doc_ids = retrieve_reference_ids(combined, theme, raga, tala, k=k, doc_range=combined.ranges.get("Rabindranath Tagore", (0, 0)))
+    return pack_references(combined.frame['lyrics'].iloc[doc_ids].tolist(), max_tokens)
 
-        return processed_df
-    except Exception as e:
-        st.error(f"Could not load dictionary data: {e}")
-        return pd.DataFrame()
+def load_dictionary_data():
+    """Load the deduplicated rhyme dictionary built by build_corpus.py"""
+    wait_for(warmup.DICTIONARY)
+    return load_prebuilt_corpus(get_registry().dictionary.corpus, "the rhyme dictionary")
+
+def load_dictionary_suffix_index(tokens_df):
+    """Load the reversed-suffix index for the dictionary, built once and saved next to the pickle"""
+    wait_for(warmup.SUFFIX_INDEX)
+    return load_suffix_index(get_registry().dictionary.corpus, tokens_df)
 
 def find_suffix_matches(query_word, tokens_df, top_n=20):
     """Find tokens with longest suffix match to the query word"""
     if query_word.strip() == "":
         return []
     
-    matches = []
-    query_word = query_word.strip()
-    
-    for _, row in tokens_df.iterrows():
-        token = str(row['token']).strip()
-        if token == "" or token == "nan":
-            continue
-        # Exclude exact matches
-        if token == query_word:
-            continue
-            
-        # Find the longest common suffix
-        max_suffix_length = 0
-        for i in range(1, min(len(query_word), len(token)) + 1):
-            if query_word[-i:] == token[-i:]:
-                max_suffix_length = i
-            else:
-                break
-        
-        if max_suffix_length > 0:
-            matches.append({
-                'token': token,
-                'token_length': row['token_length'],
-                'suffix_length': max_suffix_length,
-                'suffix': token[-max_suffix_length:]
-            })
-    
-    # Sort by suffix length (longest first), then by token length
-    matches.sort(key=lambda x: (x['suffix_length'], x['token_length']), reverse=True)
-    
-    return matches[:top_n]
+    suffix_index = load_dictionary_suffix_index(tokens_df)
+    return suffix_index.find_matches(query_word, top_n=top_n)
 
-def gemini_generate(prompt, temperature=0.8, max_tokens=500):
-    model = genai.GenerativeModel('models/gemini-1.5-flash')
-    response = model.generate_content(prompt, generation_config={
-        'temperature': temperature,
-        'max_output_tokens': max_tokens
-    })
-    # Robust error handling for Gemini responses
-    try:
-        if hasattr(response, 'text') and response.text:
-            return response.text
-        # Fallback: try to extract from parts
-        if hasattr(response, 'candidates') and response.candidates:
-            for candidate in response.candidates:
-                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                    for part in candidate.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            return part.text
-        # If finish_reason is 2 (SAFETY), show a warning
-        if hasattr(response, 'candidates') and response.candidates:
-            for candidate in response.candidates:
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 2:
-                    return "⚠️ Gemini refused to generate content due to safety filters. Try a different prompt."
-        return "⚠️ No response generated. Try a different prompt."
-    except Exception as e:
-        return f"⚠️ Error: {e}"
+def current_session_id():
+    """Streamlit session of the running script, used for fair scheduling of generation requests"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def gemini_generate(prompt, temperature=0.8, max_tokens=500, use_cache=True):
+    """Generate text with the shared generation client (Gemini unless a stand-in backend is configured).
+
+    Identical requests reuse a cached response; high temperatures always get
+    a fresh sample, and use_cache=False forces one.
+    """
+    return get_generation_client().generate(prompt, temperature, max_tokens, use_cache=use_cache, session_id=current_session_id())
+
+def gemini_generate_stream(prompt, temperature=0.8, max_tokens=500, use_cache=True):
+    """Yield the generated text in chunks as the model produces them"""
+    return get_generation_client().stream(prompt, temperature, max_tokens, use_cache=use_cache, session_id=current_session_id())
+
+def gemini_generate_variants(prompt, n, temperature=0.8, max_tokens=500, use_cache=True):
+    """Request n alternative texts concurrently; yields (variant, text) in completion order"""
+    return get_generation_client().generate_many(prompt, n, temperature, max_tokens, use_cache=use_cache, session_id=current_session_id())
+
+def validated_poem(prompt, text, length, temperature, max_tokens, variant=0, use_cache=True):
+    """Check a generated poem, repair it locally if possible, and re-request it once if not.
+
+    With use_cache, a successful re-request replaces the response in the
+    cache, so the same request doesn't hit the broken text again.
+    """
+    if not text or text.startswith("⚠️"):
+        return text
+    check = check_poem(clean_generated_text(text), length)
+    retried = False
+    if not check.ok:
+        retried = True
+        retry = get_generation_client().generate(prompt, temperature, max_tokens, use_cache=False, session_id=current_session_id())
+        if retry and not retry.startswith("⚠️"):
+            retry_check = check_poem(clean_generated_text(retry), length)
+            if len(retry_check.problems) <= len(check.problems):
+                check = retry_check
+                if use_cache:
+                    get_generation_client().store(prompt, temperature, max_tokens, retry, variant)
+    validation_stats.record(repaired=bool(check.repairs), retried=retried, failed=not check.ok)
+    return check.text
+
+def clean_generated_line(line):
+    """Strip markdown the model sometimes adds around poetry; None for lines to drop entirely"""
+    stripped = line.strip()
+    if stripped.startswith("```"):
+        return None
+    stripped = stripped.lstrip("#").replace("**", "").replace("__", "")
+    return stripped.strip()
+
+def clean_generated_text(text):
+    """clean_generated_line applied to a complete response"""
+    lines = (clean_generated_line(line) for line in text.split("\n"))
+    return "\n".join(line for line in lines if line is not None).strip("\n")
+
+def poem_html(text):
+    return f'<div class="bengali-poem">{text.replace(chr(10), "<br>")}</div>'
+
+def render_generated_header(title):
+    st.markdown(f"""
+    <div style="background: linear-gradient(135deg, #0f3460 0%, #16213e 100%); 
+                border-radius: 12px; padding: 1.5rem; margin: 1rem 0; 
+                border: 1px solid #3a3a4e;">
+        <h4 style="color: #64b5f6; margin-bottom: 1rem;">{title}</h4>
+    </div>
+    """, unsafe_allow_html=True)
+
+def stream_generation(placeholder, chunks):
+    """Render streamed text into the placeholder as it arrives and return the cleaned result.
+
+    Completed lines are cleaned once, when their newline arrives; only the
+    unfinished last line is re-rendered raw on each chunk.
+    """
+    lines, pending = [], ""
+    for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            line = clean_generated_line(line)
+            if line is not None:
+                lines.append(line)
+        placeholder.markdown(poem_html("\n".join(lines + [pending])), unsafe_allow_html=True)
+    tail = clean_generated_line(pending)
+    if tail:
+        lines.append(tail)
+    text = "\n".join(lines).strip("\n")
+    placeholder.markdown(poem_html(text), unsafe_allow_html=True)
+    return text
 
 def main():
     # Header Banner with RabindraGPT (center only)
@@ -343,18 +263,20 @@ def main():
         </div>
         '''
     st.markdown(banner_html, unsafe_allow_html=True)
+
+    # The combined corpus is resolved once per rerun, above the sidebar that
+    # also uses it, and passed to everything below. The mode picker's value
+    # from the previous interaction is already in session state.
+    mode = st.session_state.get('mode_select', "Search Music").lower().replace(' ', '_')
+    if mode in CORPUS_MODES or st.session_state.get('admin_logged_in', False):
+        combined = load_combined_corpus()
+    else:
+        combined = None
     
     # Sidebar
     with st.sidebar:
         # TagoreV1 image at the top, always centered with equal margins
-        tagore_v1_img_path = os.path.join("static", "tagoreV1.png")
-        def img_to_base64(path):
-            try:
-                with open(path, "rb") as img_file:
-                    return base64.b64encode(img_file.read()).decode()
-            except Exception:
-                return None
-        tagore_v1_b64 = img_to_base64(tagore_v1_img_path)
+        tagore_v1_b64 = startup.image_base64(os.path.join("static", "tagoreV1.png"))
         if tagore_v1_b64:
             st.markdown(f'''
                 <div style="display: flex; justify-content: center; align-items: center; width: 100%; margin-bottom: 1.2rem;">
@@ -376,14 +298,7 @@ def main():
         ]
         
         # Lyricist name dropdown for search mode
-        lyricist_options = [
-            "All",
-            "Rabindranath Tagore",
-            "Dwijendralal Ray",
-            "Atulprasad Sen",
-            "Rajnikant Sen",
-            "Kazi Nazrul Islam"
-        ]
+        lyricist_options = ["All"] + get_registry().names()
         
         if st.session_state['active_mode'] == 'search_poetry':
             st.session_state['selected_poet'] = st.selectbox("Poet Name", poet_options, key="poet_name_select")
@@ -399,6 +314,22 @@ def main():
                 st.session_state['max_tokens'] = 500
             temperature = st.slider("Creativity Level", 0.1, 2.0, st.session_state['temperature'], key="temperature_slider_sidebar")
             max_tokens = st.slider("Max Tokens", 100, 1000, st.session_state['max_tokens'], key="max_tokens_slider_sidebar")
+            st.session_state['temperature'] = temperature
+            st.session_state['max_tokens'] = max_tokens
+            st.session_state['stream_generation'] = st.checkbox("Show text as it is generated", value=True, key="stream_generation_checkbox")
+            if temperature > CACHE_MAX_TEMPERATURE:
+                st.caption("High creativity: every click generates a new response.")
+                st.session_state['fresh_generation'] = True
+            else:
+                st.session_state['fresh_generation'] = st.checkbox("Always generate a new response", value=False, key="fresh_generation_checkbox", help="By default an identical request reuses the previous response")
+            if st.session_state.get('selected_gen_mode') == 'Poetry':
+                stats = validation_stats.rates()
+                if stats['checked']:
+                    with st.expander("Poem checks"):
+                        st.caption(f"{stats['checked']} poems checked since the app started")
+                        st.metric("Repaired locally", f"{stats['repair_rate']:.0%}")
+                        st.metric("Re-requested", f"{stats['retry_rate']:.0%}")
+                        st.metric("Still invalid", f"{stats['failure_rate']:.0%}")
             
             # Music Generation Settings in Sidebar
             if 'selected_gen_mode' in st.session_state and st.session_state['selected_gen_mode'] == 'Music':
@@ -432,15 +363,19 @@ def main():
                 if music_style == "Rabindra Sangeet":
                     st.markdown("**রাগ এবং তাল নির্বাচন করুন:**")
                     try:
-                        df = load_tagore_songs_data()
-                        rag_options = [r for r in sorted(df['রাগ'].dropna().unique().tolist()) if str(r).strip() != '?' and str(r).strip() != 'nan']
-                        tal_options = [t for t in sorted(df['তাল'].dropna().unique().tolist()) if str(t).strip() != '?' and str(t).strip() != 'nan']
+                        wait_for(warmup.FACETS)
+                        facet_table = get_facet_table(combined, lyricist_doc_range(combined, "Rabindranath Tagore"))
                     except Exception:
-                        rag_options, tal_options = [], []
-                    
-                    raga = st.selectbox("রাগ (Raga)", rag_options, key="music_gen_raga_sidebar")
+                        facet_table = None
+                    rag_counts = facet_table.song_counts(RAGA) if facet_table else {}
+                    raga = st.selectbox("রাগ (Raga)", facet_table.options(RAGA) if facet_table else [], key="music_gen_raga_sidebar",
+                                        format_func=lambda value: option_label(value, rag_counts))
                     st.session_state['music_gen_raga'] = raga
-                    tala = st.selectbox("তাল (Tala)", tal_options, key="music_gen_tala_sidebar")
+                    # Only talas that Tagore set this raga to
+                    tal_counts = dict(facet_table.narrowed(RAGA, raga, TALA)) if facet_table and raga else {}
+                    tal_options = list(tal_counts) if tal_counts else (facet_table.options(TALA) if facet_table else [])
+                    tala = st.selectbox("তাল (Tala)", tal_options, key="music_gen_tala_sidebar",
+                                        format_func=lambda value: option_label(value, tal_counts))
                     st.session_state['music_gen_tala'] = tala
                 
                 # Duration
@@ -502,52 +437,92 @@ def main():
 
     if st.session_state.get('admin_logged_in', False):
         st.subheader("Edit YouTube Links (Admin)")
-        try:
-            df = load_tagore_songs_data()
-        except Exception as e:
-            st.error(f"Could not load songs: {e}")
-            df = None
-        if df is not None:
-            for idx, row in df.iterrows():
+        tagore_start, tagore_stop = combined.ranges.get("Rabindranath Tagore", (0, 0))
+        if not combined.frame.empty:
+            # Only the rows of the current page are touched on a rerun
+            missing = missing_link_ids(combined)
+            missing = missing[(missing >= tagore_start) & (missing < tagore_stop)]
+            missing_only = st.checkbox(f"Missing link only ({len(missing)} songs)", key="admin_missing_only")
+            doc_ids = missing if missing_only else np.arange(tagore_start, tagore_stop)
+            page_size = 20
+            total_pages = max((len(doc_ids) + page_size - 1) // page_size, 1)
+            page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1, key="admin_page")
+            page_ids = doc_ids[(page - 1) * page_size:page * page_size]
+            if len(doc_ids):
+                st.caption(f"Songs {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(page_ids)} of {len(doc_ids)}")
+            for doc_id, (_, row) in zip(page_ids, combined.frame.iloc[page_ids].iterrows()):
+                # Row number in tagore.pkl
+                idx = doc_id - tagore_start
                 # Determine if YouTube link is missing
                 current_url = row.get('youtube_url', '') if 'youtube_url' in row else ''
-                url_missing = not current_url or str(current_url).lower() == 'nan' or not str(current_url).startswith('http')
-                expander_label = f"ID#{idx}"
+                url_missing = not has_link(current_url)
+                lyrics = row.get('lyrics', '')
+                if isinstance(lyrics, list):
+                    lyrics_str = '\n'.join(lyrics)
+                else:
+                    lyrics_str = str(lyrics)
+                first_line = lyrics_str.strip().splitlines()[0] if lyrics_str.strip() else ""
+                expander_label = f"ID#{idx} {first_line}"
                 if url_missing:
                     expander_label = f"🟠 {expander_label} (No YouTube Link)"
                 with st.expander(expander_label):
-                    # Show lyrics above the YouTube URL
-                    lyrics = row.get('lyrics', '')
-                    if isinstance(lyrics, list):
-                        lyrics_str = '\n'.join(lyrics)
-                    else:
-                        lyrics_str = str(lyrics)
-                    style = "background: #fffde7; border: 2px solid #ff9800; border-radius: 8px; padding: 8px; margin-bottom: 1rem; color: #333;" if url_missing else "margin-bottom: 1rem; color: #333;"
-                    st.markdown(f'<div class="bengali-poem" style="{style}">{lyrics_str.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
-                    st.markdown(f"**Current YouTube URL:** {current_url}")
+                    # The full lyrics are only rendered on request
+                    if st.toggle("Show lyrics", key=f"admin_lyrics_{idx}"):
+                        style = "background: #fffde7; border: 2px solid #ff9800; border-radius: 8px; padding: 8px; margin-bottom: 1rem; color: #333;" if url_missing else "margin-bottom: 1rem; color: #333;"
+                        st.markdown(f'<div class="bengali-poem" style="{style}">{lyrics_str.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
+                    st.markdown(f"**Current YouTube URL:** {'' if pd.isna(current_url) else current_url}")
 
                     edit_btn_key = f"edit_yt_btn_{idx}"
                     edit_state_key = f"edit_yt_state_{idx}"
                     url_key = f"yturl_{idx}"
                     update_key = f"update_{idx}"
 
-                    if edit_state_key not in st.session_state:
-                        st.session_state[edit_state_key] = False
-                    if url_key not in st.session_state:
-                        st.session_state[url_key] = str(current_url)
-
-                    if not st.session_state[edit_state_key]:
+                    # Per-song state only exists once that song is being edited
+                    if not st.session_state.get(edit_state_key, False):
                         if st.button("Edit", key=edit_btn_key):
                             st.session_state[edit_state_key] = True
+                            # Missing links are NaN in pickles and <NA> in Arrow-backed corpora
+                            st.session_state[url_key] = '' if pd.isna(current_url) else str(current_url)
+                            st.rerun()
                     else:
-                        new_url = st.text_input("New YouTube URL", value=st.session_state[url_key], key=url_key)
+                        new_url = st.text_input("New YouTube URL", key=url_key)
                         if st.button("Update", key=update_key):
-                            # Note: Google Drive updates require Google Sheets API
-                            # For now, this functionality is disabled
-                            st.warning("⚠️ YouTube URL updates are currently disabled. Google Drive integration requires additional API setup.")
-                            st.info("To enable updates, you'll need to implement Google Sheets API integration.")
-                            st.session_state[edit_state_key] = False
-                            # Do NOT assign to st.session_state[url_key] here
+                            new_url = new_url.strip()
+                            if new_url and not has_link(new_url):
+                                st.error("Enter a full link starting with http, or leave it empty to remove the link.")
+                            else:
+                                try:
+                                    # Saved to the local edits overlay and applied to the shared corpus in place
+                                    doc_id = update_cell(combined.paths["Rabindranath Tagore"], idx, 'youtube_url', new_url or None)
+                                    if doc_id is not None:
+                                        update_link(combined, doc_id, new_url)
+                                    st.session_state[edit_state_key] = False
+                                    st.toast(f"Saved the YouTube link of ID#{idx}")
+                                    st.rerun()
+                                except (OSError, sqlite3.Error) as e:
+                                    st.error(f"Could not save the link: {e}")
+            edit_store = get_edit_store()
+            pending = edit_store.pending_count() if edit_store is not None else 0
+            if pending:
+                if sheet_sync_available():
+                    if st.button(f"Sync {pending} edit(s) to the Google Sheet", key="admin_sync_edits"):
+                        try:
+                            synced = sync_edits(sheet_writer(get_registry().sheets()))
+                            st.success(f"Synced {synced} edit(s) to the Google Sheet.")
+                            unsynced = edit_store.pending_count()
+                            if unsynced:
+                                st.warning(f"{unsynced} edit(s) have no matching sheet or column and stay pending; the server log has the details.")
+                        except Exception as e:
+                            st.error(f"Could not sync to the Google Sheet: {e}")
+                else:
+                    st.caption(f"{pending} edit(s) are saved locally and not yet in the Google Sheet. Set RABINDRAGPT_SHEETS_CREDENTIALS to sync them.")
+            with st.expander("Startup"):
+                imports = startup.import_times()
+                st.caption(f"app.py imports: {imports['cold']:.2f}s on first run, {imports['last']:.2f}s on this run")
+                timings = warmup.start_warmup().timings
+                for artifact, state in warmup.status().items():
+                    loaded = f" in {timings[artifact]:.1f}s" if artifact in timings else ""
+                    st.caption(f"{artifact}: {state}{loaded}")
             if st.button("Logout (Admin)"):
                 st.session_state['admin_logged_in'] = False
                 st.session_state['show_admin_portal'] = False
@@ -555,7 +530,8 @@ def main():
     if st.session_state['active_mode'] == 'search_poetry':
         # Poetry Search tools with additional filters
         st.subheader("Poetry Search")
-        keyword = st.text_input("Keyword (Bengali or English)", "", key="poetry_search")
+        keyword = st.text_input("Keyword (Bengali or English)", "", key="poetry_search", help="All words must match, also as parts of longer words. Quote a phrase to match it exactly; put OR between alternatives, e.g. মেঘ OR \"শ্রাবণ ঘন\"")
+        search_by_meaning = st.checkbox("Search by meaning", key="poetry_search_by_meaning", help="Find poems about a theme, e.g. rain and longing, instead of matching words")
         selected_poet = st.session_state.get('selected_poet', 'All')
         # --- Poetry Search Pagination Refactor ---
         if 'poetry_search_results' not in st.session_state:
@@ -567,11 +543,18 @@ def main():
         if st.button("Search Poetry", key="do_search"):
             st.session_state['current_page'] = 0
             try:
-                df = load_tagore_songs_data()
-                if keyword.strip():
-                    matches = df[df['lyrics'].str.contains(keyword, case=False, na=False)]
+                # Sessions keep row IDs (or just "every poem"), never the rows.
+                # IDs and version come from one corpus object, so a rebuild can't mislabel them
+                if keyword.strip() and search_by_meaning:
+                    matches = search_lyrics_ids_by_meaning(combined, keyword, "Rabindranath Tagore")
+                    if matches is None:
+                        st.warning(SEMANTIC_INDEX_MISSING)
+                        matches = np.zeros(0, dtype=np.int64)
+                    matches = ResultSet("Rabindranath Tagore", matches, version=combined.version)
+                elif keyword.strip():
+                    matches = ResultSet("Rabindranath Tagore", search_lyrics_ids(combined, keyword, "Rabindranath Tagore"), version=combined.version)
                 else:
-                    matches = df
+                    matches = ResultSet.everything(combined, "Rabindranath Tagore")
                 st.session_state['poetry_search_results'] = matches
                 st.session_state['poetry_total_pages'] = (len(matches) + 19) // 20
             except Exception as e:
@@ -580,6 +563,11 @@ def main():
                 st.error(f"Could not load poetry from Google Drive: {e}")
         # Show results if available
         results = st.session_state.get('poetry_search_results', None)
+        if results is not None and not results.is_current(combined):
+            # Row IDs of an older corpus would point at other poems
+            st.session_state['poetry_search_results'] = results = None
+            st.session_state['poetry_total_pages'] = 0
+            st.info(SEARCH_AGAIN)
         total_pages = st.session_state.get('poetry_total_pages', 0)
         if results is not None and len(results) > 0:
             st.success(f"Found {len(results)} matching poem(s):")
@@ -587,26 +575,14 @@ def main():
             # --- Custom Page Navigation UI ---
             start_idx = st.session_state['current_page'] * page_size
             end_idx = min(start_idx + page_size, len(results))
-            current_page_data = results.iloc[start_idx:end_idx]
+            current_page_data = results.page(combined, start_idx, end_idx)
             for _, row in current_page_data.iterrows():
                 first_line = row['lyrics'].splitlines()[0].rstrip('।.,!?,;: ')
                 def safe(val):
-                    return 'অজানা' if str(val).strip() == '?' or str(val).strip() == 'nan' else val
+                    # Missing cells are NaN in pickles and <NA> in Arrow-backed corpora
+                    return 'অজানা' if pd.isna(val) or str(val).strip() == '?' or str(val).strip() == 'nan' else val
                 
-                # Determine the lyricist name from the data
-                if 'lyricist' in row:
-                    lyricist_name = row['lyricist']
-                else:
-                    # Fallback to selected poet if lyricist column doesn't exist
-                    selected_poet = st.session_state.get('selected_poet', 'All')
-                    if selected_poet == 'Rabindranath Tagore':
-                        lyricist_name = "Rabindranath Tagore"
-                    elif selected_poet == 'Dwijendralal Ray':
-                        lyricist_name = "Dwijendralal Ray"
-                    elif selected_poet == 'Atulprasad Sen':
-                        lyricist_name = "Atulprasad Sen"
-                    else:
-                        lyricist_name = "Rabindranath Tagore"  # Default fallback
+                lyricist_name = row['lyricist']
                 
                 with st.expander(f"{first_line} - {lyricist_name}"):
                     st.markdown(f'<div class="bengali-poem">{row["lyrics"].replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
@@ -640,25 +616,40 @@ def main():
         
         try:
             # Load data based on selected lyricist
-            df = load_combined_songs_data(selected_lyricist)
-            
-            # Get raga and tala options from the loaded data
-            if not df.empty:
-                rag_options = ['All'] + sorted([r for r in df['রাগ'].dropna().unique().tolist() if str(r).strip() != '?' and str(r).strip() != 'nan'])
-                tal_options = ['All'] + sorted([t for t in df['তাল'].dropna().unique().tolist() if str(t).strip() != '?' and str(t).strip() != 'nan'])
-            else:
-                rag_options, tal_options = ['All'], ['All']
+            df = combined.select(selected_lyricist)
+            wait_for(warmup.FACETS)
+            facet_table = get_facet_table(combined, lyricist_doc_range(combined, selected_lyricist))
         except Exception as e:
             st.error(f"Could not load music from Google Drive: {e}")
-            rag_options, tal_options = ['All'], ['All']
+            facet_table = None
             df = None
             
-        keyword = st.text_input("Keyword (Bengali or English)", "", key="music_search")
+        keyword = st.text_input("Keyword (Bengali or English)", "", key="music_search", help="All words must match, also as parts of longer words. Quote a phrase to match it exactly; put OR between alternatives, e.g. মেঘ OR \"শ্রাবণ ঘন\"")
+        search_by_meaning = st.checkbox("Search by meaning", key="music_search_by_meaning", help="Find songs about a theme, e.g. rain and longing, instead of matching words")
         col_rag, col_tal = st.columns(2)
         with col_rag:
-            selected_rag = st.selectbox("রাগ (Raga)", rag_options, key="rag_select")
+            rag_counts = facet_table.song_counts(RAGA) if facet_table else {}
+            selected_rag = st.selectbox("রাগ (Raga)", ['All'] + list(rag_counts), key="rag_select",
+                                        format_func=lambda value: option_label(value, rag_counts))
         with col_tal:
-            selected_tal = st.selectbox("তাল (Tala)", tal_options, key="tal_select")
+            # A selected raga narrows the talas to the ones it is sung in
+            if facet_table and selected_rag != 'All':
+                tal_counts = dict(facet_table.narrowed(RAGA, selected_rag, TALA))
+            else:
+                tal_counts = facet_table.song_counts(TALA) if facet_table else {}
+            selected_tal = st.selectbox("তাল (Tala)", ['All'] + list(tal_counts), key="tal_select",
+                                        format_func=lambda value: option_label(value, tal_counts))
+        col_notator, col_year = st.columns(2)
+        with col_notator:
+            notator_counts = facet_table.song_counts(NOTATOR) if facet_table else {}
+            selected_notator = st.selectbox("স্বরলিপিকার (Notation)", ['All'] + list(notator_counts), key="notator_select",
+                                            format_func=lambda value: option_label(value, notator_counts))
+        with col_year:
+            first_year, last_year = facet_table.years if facet_table else (0, 0)
+            if first_year < last_year:
+                selected_years = st.slider("রচনাকাল (Year)", first_year, last_year, (first_year, last_year), key="year_select")
+            else:
+                selected_years = (first_year, last_year)
         # --- Music Search Pagination Refactor ---
         if 'music_search_results' not in st.session_state:
             st.session_state['music_search_results'] = None
@@ -669,6 +660,13 @@ def main():
         # Initialize search status in session state
         if 'music_search_status' not in st.session_state:
             st.session_state['music_search_status'] = ''
+        stale = st.session_state['music_search_results']
+        if stale is not None and not stale.is_current(combined):
+            # Row IDs of an older corpus would point at other songs
+            st.session_state['music_search_results'] = None
+            st.session_state['music_total_pages'] = 0
+            st.session_state['music_search_status'] = ''
+            st.info(SEARCH_AGAIN)
         
         col_btn, col_msg = st.columns([2, 3])
         with col_btn:
@@ -698,13 +696,25 @@ def main():
             st.session_state['current_page_music'] = 0
             try:
                 if df is not None and not df.empty:
-                    filtered = df
-                    if keyword.strip():
-                        filtered = filtered[filtered['lyrics'].str.contains(keyword, case=False, na=False)]
-                    if selected_rag != 'All':
-                        filtered = filtered[filtered['রাগ'] == selected_rag]
-                    if selected_tal != 'All':
-                        filtered = filtered[filtered['তাল'] == selected_tal]
+                    # Keyword matches (in rank order) narrowed by the precomputed facet ID sets;
+                    # rows are only materialized for the page being shown
+                    candidates = None
+                    if keyword.strip() and search_by_meaning:
+                        candidates = search_lyrics_ids_by_meaning(combined, keyword, selected_lyricist)
+                        if candidates is None:
+                            st.warning(SEMANTIC_INDEX_MISSING)
+                            candidates = np.zeros(0, dtype=np.int64)
+                    elif keyword.strip():
+                        candidates = search_lyrics_ids(combined, keyword, selected_lyricist)
+                    facet_values = {column: value for column, value in (
+                        (RAGA, selected_rag), (TALA, selected_tal), (NOTATOR, selected_notator)
+                    ) if value != 'All'}
+                    # The full year span means no year filter, so undated songs stay in
+                    year_range = selected_years if selected_years != facet_table.years else None
+                    if candidates is None and not facet_values and year_range is None:
+                        filtered = ResultSet.everything(combined, selected_lyricist)
+                    else:
+                        filtered = ResultSet(selected_lyricist, filter_ids(combined, candidates, lyricist_doc_range(combined, selected_lyricist), facet_values, year_range), version=combined.version)
                     
                     st.session_state['music_search_results'] = filtered
                     st.session_state['music_total_pages'] = (len(filtered) + 19) // 20
@@ -731,7 +741,7 @@ def main():
             # --- Custom Page Navigation UI ---
             start_idx = st.session_state['current_page_music'] * page_size
             end_idx = min(start_idx + page_size, len(results))
-            current_page_data = results.iloc[start_idx:end_idx]
+            current_page_data = results.page(combined, start_idx, end_idx)
             # Accordion behavior: only one expander open at a time
             if 'music_expander_open' not in st.session_state:
                 st.session_state['music_expander_open'] = None
@@ -743,22 +753,10 @@ def main():
                 if first_line.strip().lower() == 'youtube_url':
                     continue  # Skip header or malformed row
                 def safe(val):
-                    return 'অজানা' if str(val).strip() == '?' or str(val).strip() == 'nan' else val
+                    # Missing cells are NaN in pickles and <NA> in Arrow-backed corpora
+                    return 'অজানা' if pd.isna(val) or str(val).strip() == '?' or str(val).strip() == 'nan' else val
                 
-                # Determine the lyricist name from the data
-                if 'lyricist' in row:
-                    lyricist_name = row['lyricist']
-                else:
-                    # Fallback to selected lyricist if lyricist column doesn't exist
-                    selected_lyricist = st.session_state.get('selected_lyricist', 'All')
-                    if selected_lyricist == 'Rabindranath Tagore':
-                        lyricist_name = "Rabindranath Tagore"
-                    elif selected_lyricist == 'Dwijendralal Ray':
-                        lyricist_name = "Dwijendralal Ray"
-                    elif selected_lyricist == 'Atulprasad Sen':
-                        lyricist_name = "Atulprasad Sen"
-                    else:
-                        lyricist_name = "Rabindranath Tagore"  # Default fallback
+                lyricist_name = row['lyricist']
                 
                 exp_key = f"music_expander_{start_idx + idx}"
                 expanded = st.session_state['music_expander_open'] == exp_key
@@ -818,8 +816,8 @@ def main():
                     )
                     st.markdown(f'<span style="font-size: 0.92rem; color: #b0bec5;">{metadata_line}</span>', unsafe_allow_html=True)
                     st.markdown(f"[View Original]({row['url']})")
-                    # Song ID at bottom right (universally unique, based on Excel row)
-                    song_id = row.name + 1  # DataFrame index is 0-based, so add 1 for display
+                    # Song ID at bottom right (stable global ID: source corpus plus Excel row)
+                    song_id = row['song_id'] if 'song_id' in row else row.name + 1
                     st.markdown(f'''<div style="position: relative; height: 24px;">
                         <span style="position: absolute; right: 0; bottom: 0; font-size: 1.1rem; color: #90caf9; opacity: 0.85; font-weight: bold;">#{song_id}</span>
                     </div>''', unsafe_allow_html=True)
@@ -840,8 +838,16 @@ def main():
                         st.session_state['current_page_music'] += 1
         elif results is not None:
             selected_lyricist = st.session_state.get('selected_lyricist', 'All')
-            if selected_lyricist != 'All' and selected_lyricist not in ['Rabindranath Tagore', 'Dwijendralal Ray', 'Atulprasad Sen']:
-                st.info(f"No songs available for {selected_lyricist} yet. Currently only Rabindranath Tagore, Dwijendralal Ray, and Atulprasad Sen's songs are available in our database.")
+            available = [lyricist.name for lyricist in get_registry().with_songs()]
+            if selected_lyricist != 'All' and selected_lyricist not in available:
+                if len(available) > 2:
+                    available_names = f"{', '.join(available[:-1])}, and {available[-1]}"
+                else:
+                    available_names = " and ".join(available)
+                if available:
+                    st.info(f"No songs available for {selected_lyricist} yet. Currently only {available_names}'s songs are available in our database.")
+                else:
+                    st.info(f"No songs available for {selected_lyricist} yet.")
             else:
                 st.info("No matching songs found. Try another filter!")
     elif st.session_state['active_mode'] == 'generate':
@@ -892,8 +898,12 @@ def main():
                     length = st.number_input("Poem Length", min_value=1, max_value=20, value=8, step=1, label_visibility="collapsed")
                     st.markdown("**Additional Prompt**")
                     context = st.text_input("Additional prompt", placeholder="Any additional instructions...", label_visibility="collapsed")
+                    st.markdown("**Variants**")
+                    variants = st.number_input("Variants", min_value=1, max_value=4, value=1, step=1, label_visibility="collapsed",
+                                               help="Write several alternative poems at once; each appears as soon as it is ready")
                 
                 # Generate button
+                streamed = False
                 if st.button("Generate Poetry", key="do_generate_poetry", use_container_width=True):
                     with st.spinner("✨ Generating poetry with Gemini..."):
                         # Map poetry type to Bengali label for clearer instruction
@@ -915,17 +925,33 @@ def main():
                             f"নির্দেশনা: শুধুমাত্র বাংলা লিপি ব্যবহার করবে—ইংরেজি বর্ণ/শব্দ, রোমান হরফ, অনুবাদ, ব্যাখ্যা, বা অতিরিক্ত কোনো টেক্সট একদম নয়।"
                             f" শুধু কবিতার লাইনগুলো দেবে; কোনো শিরোনাম, নম্বরিং, বা বুলেট নয়। মোট {length} লাইন হবে এবং শেষ লাইনের পর অতিরিক্ত লাইন দেবে না।"
                         )
-                        result = gemini_generate(prompt, st.session_state['temperature'], st.session_state['max_tokens'])
+                        use_cache = not st.session_state.get('fresh_generation', False)
+                        if variants > 1:
+                            # All variants are requested at once and shown as each one finishes
+                            render_generated_header("✨ Generated Poetry")
+                            placeholders = []
+                            for number in range(variants):
+                                st.markdown(f"**Variant {number + 1}**")
+                                placeholders.append(st.empty())
+                            for variant, text in gemini_generate_variants(prompt, variants, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache):
+                                text = validated_poem(prompt, text, length, st.session_state['temperature'], st.session_state['max_tokens'], variant, use_cache=use_cache)
+                                placeholders[variant].markdown(poem_html(text), unsafe_allow_html=True)
+                            streamed = True
+                        elif st.session_state.get('stream_generation', True):
+                            render_generated_header("✨ Generated Poetry")
+                            placeholder = st.empty()
+                            streamed_text = stream_generation(placeholder, gemini_generate_stream(prompt, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache))
+                            result = validated_poem(prompt, streamed_text, length, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache)
+                            if result != streamed_text:
+                                placeholder.markdown(poem_html(result), unsafe_allow_html=True)
+                            streamed = True
+                        else:
+                            result = gemini_generate(prompt, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache)
+                            result = validated_poem(prompt, result, length, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache)
                 
-                if result:
-                    st.markdown("""
-                    <div style="background: linear-gradient(135deg, #0f3460 0%, #16213e 100%); 
-                                border-radius: 12px; padding: 1.5rem; margin: 1rem 0; 
-                                border: 1px solid #3a3a4e;">
-                        <h4 style="color: #64b5f6; margin-bottom: 1rem;">✨ Generated Poetry</h4>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.markdown(f'<div class="bengali-poem">{result.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
+                if result and not streamed:
+                    render_generated_header("✨ Generated Poetry")
+                    st.markdown(poem_html(result), unsafe_allow_html=True)
             elif gen_mode == "Music":
                 st.markdown("""
                 <div style="background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%); 
@@ -938,37 +964,42 @@ def main():
                 st.markdown("Configure your music settings in the sidebar, then click the generate button below.")
                 
                 # Generate Button in main area
+                streamed = False
                 if st.button("🎼 Generate Music Lyrics", key="do_generate_music", use_container_width=True):
                     with st.spinner("🎵 Generating music lyrics with Gemini..."):
                         music_style = st.session_state.get('music_gen_style', 'Rabindra Sangeet')
                         duration = st.session_state.get('music_gen_duration', 120)
-                        if music_style == "Rabindra Sangeet" and st.session_state.get('music_gen_raga') and st.session_state.get('music_gen_tala'):
+                        if music_style == "Rabindra Sangeet":
+                            raga = st.session_state.get('music_gen_raga', '')
+                            tala = st.session_state.get('music_gen_tala', '')
+                            theme = st.session_state.get('music_gen_query', '')
                             try:
-                                df = load_tagore_songs_data()
-                                filtered = df[(df['রাগ'] == st.session_state['music_gen_raga']) & (df['তাল'] == st.session_state['music_gen_tala'])]
-                                if not filtered.empty:
-                                    ref_row = filtered.sample(1).iloc[0]
-                                    ref_lyrics = ref_row['lyrics']
-                                    prompt = f"Write a Bengali song similar to the following, using raga: {st.session_state['music_gen_raga']} and tala: {st.session_state['music_gen_tala']}. Reference lyrics: {ref_lyrics}"
-                                else:
-                                    st.warning(f"No matching Rabindra Sangeet found for রাগ: {st.session_state['music_gen_raga']} and তাল: {st.session_state['music_gen_tala']}.")
-                                    prompt = None
+                                ref_lyrics = retrieve_reference_lyrics(combined, theme, raga, tala)
                             except Exception as e:
-                                st.warning(f"Error loading from Google Drive: {e}")
-                                prompt = None
+                                st.warning(f"Could not load reference songs: {e}")
+                                ref_lyrics = ""
+                            prompt = (
+                                f"Write a Bengali song in the style of Rabindra Sangeet"
+                                f"{f' on theme: {theme}' if theme else ''}"
+                                f"{f', using raga: {raga}' if raga else ''}"
+                                f"{f' and tala: {tala}' if tala else ''}"
+                                f", of length suitable for {duration} seconds."
+                            )
+                            if ref_lyrics:
+                                prompt += f" Use these songs as reference for language, imagery and meter:\n\n{ref_lyrics}"
                         else:
                             prompt = f"Generate Bengali music lyrics in style: {music_style} on theme: {st.session_state.get('music_gen_query', 'Any')} of length suitable for {duration} seconds."
-                        result = gemini_generate(prompt, st.session_state['temperature'], st.session_state['max_tokens']) if prompt else None
+                        use_cache = not st.session_state.get('fresh_generation', False)
+                        if prompt and st.session_state.get('stream_generation', True):
+                            render_generated_header("🎵 Generated Music Lyrics")
+                            result = stream_generation(st.empty(), gemini_generate_stream(prompt, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache))
+                            streamed = True
+                        else:
+                            result = gemini_generate(prompt, st.session_state['temperature'], st.session_state['max_tokens'], use_cache=use_cache) if prompt else None
                 
-                if result:
-                    st.markdown("""
-                    <div style="background: linear-gradient(135deg, #0f3460 0%, #16213e 100%); 
-                                border-radius: 12px; padding: 1.5rem; margin: 1rem 0; 
-                                border: 1px solid #3a3a4e;">
-                        <h4 style="color: #64b5f6; margin-bottom: 1rem;">🎵 Generated Music Lyrics</h4>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.markdown(f'<div class="bengali-poem">{result.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
+                if result and not streamed:
+                    render_generated_header("🎵 Generated Music Lyrics")
+                    st.markdown(poem_html(result), unsafe_allow_html=True)
 
     elif st.session_state['active_mode'] == 'dictionary':
         # Dictionary Section
@@ -1011,8 +1042,8 @@ def main():
                             results_data.append({
                                 "Rank": i,
                                 "Token": match['token'],
-                                "Token Length": match['token_length'],
-                                "Suffix Length": match['suffix_length'],
+                                "Token Length (aksharas)": match['token_length'],
+                                "Suffix Length (aksharas)": match['suffix_length'],
                                 "Common Suffix": match['suffix']
                             })
                         
@@ -1024,7 +1055,7 @@ def main():
                         st.markdown(f"**Query Word:** {query_word}")
                         st.markdown(f"**Total Matches Found:** {len(matches)}")
                         if matches:
-                            st.markdown(f"**Longest Suffix Match:** {matches[0]['suffix']} ({matches[0]['suffix_length']} characters)")
+                            st.markdown(f"**Longest Suffix Match:** {matches[0]['suffix']} ({matches[0]['suffix_length']} aksharas)")
                     else:
                         st.info("No suffix matches found for the given word. Try a different word!")
             elif search_clicked and not query_word.strip():
@@ -0,0 +1,82 @@
+"""Bengali text helpers shared by the dictionary and search indexes."""
+
+import re
+import unicodedata
+
+import numpy as np
+
+# A consonant (ক-হ, khanda ta, ড় ঢ় য়), optionally followed by nukta
+_CONSONANT = "[\u0995-\u09b9\u09ce\u09dc\u09dd\u09df]\u09bc?"
+# Hasanta, optionally wrapped in ZWNJ/ZWJ (as in র‍্য)
+_HASANTA = "[\u200c\u200d]?\u09cd[\u200c\u200d]?"
+# Independent vowels
+_VOWEL = "[\u0985-\u0994\u09e0\u09e1]"
+# Dependent vowel signs, then candrabindu/anusvara/visarga
+_VOWEL_SIGNS = "[\u09be-\u09c4\u09c7\u09c8\u09cb\u09cc\u09d7\u09e2\u09e3]*"
+_MODIFIERS = "[\u0981-\u0983]*"
+# Any combining mark that may trail a character outside a regular akshara
+_MARKS = "[\u0981-\u0983\u09bc\u09be-\u09c4\u09c7\u09c8\u09cb-\u09cd\u09d7\u09e2\u09e3\u200c\u200d]*"
+
+# One akshara: a conjunct (consonants joined by hasanta) or an independent
+# vowel, followed by its vowel signs and modifiers. Anything else is taken
+# one character at a time together with whatever marks follow it.
+AKSHARA_PATTERN = re.compile(
+    f"(?:{_CONSONANT}(?:{_HASANTA}{_CONSONANT})*(?:{_HASANTA})?|{_VOWEL})"
+    f"{_VOWEL_SIGNS}{_MODIFIERS}"
+    f"|.{_MARKS}",
+    re.DOTALL,
+)
+
+
+def split_aksharas(text):
+    """Split a string into aksharas (Bengali grapheme clusters)"""
+    return AKSHARA_PATTERN.findall(text)
+
+
+def segment_aksharas(texts):
+    """Vectorized akshara segmentation of a Series of strings.
+
+    Returns the aksharas of every string as one flat array plus CSR-style
+    `starts`: string i owns aksharas[starts[i]:starts[i + 1]]. `char_offsets`
+    holds the position of each akshara inside its own string.
+    """
+    texts = texts.reset_index(drop=True)
+    clusters = texts.str.findall(AKSHARA_PATTERN)
+    counts = clusters.str.len().to_numpy()
+    starts = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=starts[1:])
+
+    flat = clusters.explode()
+    flat = flat[flat.notna()]
+    lengths = flat.str.len()
+    char_offsets = (lengths.groupby(level=0).cumsum() - lengths).to_numpy(dtype=np.int32)
+
+    return flat.to_numpy(dtype=object), starts, char_offsets
+
+
+# Zero-width characters that change the code points but not the rendering
+_ZERO_WIDTH = "\u200b\u200c\u200d\u2060\ufeff"
+# Punctuation treated as a word break when searching (dandas, quotes, dashes...)
+_PUNCTUATION = "।॥,;:!?.\"'‘’“”-–—()[]{}"
+_NORMALIZE_TABLE = str.maketrans(
+    {**{c: None for c in _ZERO_WIDTH}, **{c: " " for c in _PUNCTUATION}}
+)
+# Legacy spellings that render the same as a single code point
+_LEGACY_SEQUENCES = {"\u0985\u09be": "\u0986"}
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Canonical form of Bengali text for search matching.
+
+    NFC (which also settles the nukta forms, e.g. য় vs য + ়), drops zero-width
+    joiners, turns punctuation such as । into spaces, collapses whitespace and
+    case-folds Latin letters. Apply it to the corpus once at index time and to
+    every query, so both sides compare the same code points.
+    """
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFC", text).translate(_NORMALIZE_TABLE)
+    for legacy, canonical in _LEGACY_SEQUENCES.items():
+        text = text.replace(legacy, canonical)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
@@ -0,0 +1,184 @@
+"""Offline build of every data artifact the app loads.
+
+The app only reads what this command writes; it never downloads a sheet or
+writes a corpus while serving a request. A build:
+
+1. ingests each song corpus and the rhyme dictionary, from CSV exports in a
+   directory (--from-dir) or straight from the Google Sheets CSV export;
+2. normalizes text cells (NFC, trimmed) and dedupes the dictionary tokens;
+3. writes the pickles and their memory-mappable Arrow copies;
+4. builds the lyrics search index and the rhyme suffix index (and, with
+   --embeddings, the semantic index);
+5. writes songs/manifest.json describing the build.
+
+Every file is written under a temporary name and moved into place, so a
+running app never sees a half-written artifact. Usage:
+
+    python build_corpus.py                      # fetch the sheets
+    python build_corpus.py --from-dir exports   # exports/tagore.csv, ...
+    python build_corpus.py --skip-ingest        # only rebuild derived artifacts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from corpus import LOAD_WORKERS, arrow_path, convert_to_arrow, get_corpus, invalidate_corpus
+from lyricists import get_registry, load_combined
+from lyrics_index import INDEX_VERSION as LYRICS_INDEX_VERSION, load_lyrics_index
+from rhyme_index import INDEX_VERSION as SUFFIX_INDEX_VERSION, load_suffix_index, suffix_index_path
+from semantic_index import EMBEDDINGS_PATH, INDEX_VERSION as SEMANTIC_INDEX_VERSION, METADATA_PATH, build_semantic_index
+
+MANIFEST_PATH = "songs/manifest.json"
+
+
+def sheet_csv_url(sheet_id, gid):
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+
+
+def read_source(source, from_dir=None):
+    """Raw rows of one registry source: <from_dir>/<stem>.csv when given, else the sheet export"""
+    if from_dir is not None:
+        stem = os.path.splitext(os.path.basename(source.corpus))[0]
+        return pd.read_csv(os.path.join(from_dir, f"{stem}.csv"))
+    return pd.read_csv(sheet_csv_url(source.sheet_id, source.gid))
+
+
+def _normalize_cell(value):
+    if isinstance(value, str):
+        return unicodedata.normalize("NFC", value).strip()
+    return value
+
+
+def normalize_songs(df):
+    """NFC-normalize and trim every text cell.
+
+    Rows are never dropped or reordered: a song's row number is its ID in
+    song_id, in the edits overlay and in the sheet sync.
+    """
+    df = df.copy()
+    for column in df.columns:
+        # read_csv gives text columns object dtype on older pandas and str dtype from pandas 3
+        if pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].map(_normalize_cell)
+    return df
+
+
+def normalize_dictionary(raw_df):
+    """Trimmed tokens, first occurrence of each, with token_length"""
+    if 'token' not in raw_df.columns:
+        raise ValueError("Dictionary sheet must contain a 'token' column.")
+    df = raw_df.copy()
+    df['token'] = df['token'].astype(str).map(_normalize_cell)
+    # Drop rows with empty or invalid tokens
+    df = df[(df['token'] != '') & (df['token'].str.lower() != 'nan')]
+    df = df.drop_duplicates(subset=['token'], keep='first').reset_index(drop=True)
+    df['token_length'] = df['token'].str.len()
+    return df
+
+
+def write_pickle(df, path):
+    """Atomically replace a pickle, then refresh its Arrow copy when pyarrow is available"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    try:
+        convert_to_arrow(path)
+    except ImportError:
+        pass
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(artifacts, path=MANIFEST_PATH):
+    """Record the build id and the size and hash of every artifact"""
+    manifest = {
+        'build': time.strftime("%Y%m%dT%H%M%S"),
+        'artifacts': {
+            artifact: {'bytes': os.path.getsize(artifact), 'sha256': file_digest(artifact), **details}
+            for artifact, details in artifacts.items() if os.path.exists(artifact)
+        },
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def ingest(label, source, normalize, from_dir=None):
+    """Fetch, normalize and write one registry source; returns its row count"""
+    df = normalize(read_source(source, from_dir))
+    write_pickle(df, source.corpus)
+    print(f"{label}: {len(df)} rows -> {source.corpus}")
+    return len(df)
+
+
+def build(from_dir=None, skip_ingest=False, embeddings=False):
+    registry = get_registry()
+    lyricists = registry.with_songs()
+    artifacts = {}
+    if not skip_ingest:
+        jobs = [(lyricist.name, lyricist.source, normalize_songs) for lyricist in lyricists]
+        jobs.append(("Dictionary", registry.dictionary, normalize_dictionary))
+        # Every source is an independent download and file, so fetch them side by side
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+            futures = [pool.submit(ingest, label, source, normalize, from_dir) for label, source, normalize in jobs]
+            for future in futures:
+                future.result()
+        invalidate_corpus()
+
+    for lyricist in lyricists:
+        path = lyricist.source.corpus
+        artifacts[path] = {'lyricist': lyricist.name, 'rows': len(get_corpus(path))}
+        artifacts[arrow_path(path)] = {'lyricist': lyricist.name}
+
+    combined = load_combined(registry)
+    load_lyrics_index(combined)
+    artifacts["songs/lyrics_index.pkl"] = {'index_version': LYRICS_INDEX_VERSION}
+    print(f"Lyrics index: {len(combined.frame)} songs")
+
+    dictionary_path = registry.dictionary.corpus
+    tokens_df = get_corpus(dictionary_path)
+    load_suffix_index(dictionary_path, tokens_df)
+    artifacts[dictionary_path] = {'rows': len(tokens_df)}
+    artifacts[arrow_path(dictionary_path)] = {}
+    artifacts[suffix_index_path(dictionary_path)] = {'index_version': SUFFIX_INDEX_VERSION}
+    print(f"Rhyme index: {len(tokens_df)} tokens")
+
+    if embeddings:
+        build_semantic_index(combined)
+        artifacts[EMBEDDINGS_PATH] = {'index_version': SEMANTIC_INDEX_VERSION}
+        artifacts[METADATA_PATH] = {}
+        print(f"Semantic index: {len(combined.frame)} songs")
+
+    manifest = write_manifest(artifacts)
+    print(f"Build {manifest['build']} -> {MANIFEST_PATH}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the song corpora, dictionary and search indexes")
+    parser.add_argument("--from-dir", help="read <name>.csv exports from this directory instead of the Google Sheets")
+    parser.add_argument("--skip-ingest", action="store_true", help="keep the current pickles; only rebuild derived artifacts")
+    parser.add_argument("--embeddings", action="store_true", help="also embed every song for search by meaning (needs the local model)")
+    args = parser.parse_args()
+    build(from_dir=args.from_dir, skip_ingest=args.skip_ingest, embeddings=args.embeddings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Process-wide registry of the song corpora.
+
+Each pickle under songs/ is read once per process and shared by every
+Streamlit session. Callers get a shallow copy-on-write view, so adding a
+column or editing a cell in one session never leaks into the shared frame or
+into other sessions. A changed file mtime triggers a reload on next access.
+
+A corpus can also be stored as an uncompressed Arrow (Feather v2) file next
+to its pickle, e.g. songs/tagore.arrow. When that file exists and is at
+least as new as the pickle it is memory-mapped instead: columns become
+pyarrow-backed and zero-copy, so only the pages a request actually touches
+are read, and every worker process shares them through the page cache
+rather than holding a private unpickled copy. Convert the pickles with
+
+    python corpus.py
+
+The pickle stays the fallback when the Arrow file is missing or stale, or
+when pyarrow is not installed.
+
+Local edits from corpus_edits are applied on every load, and `update_cell`
+applies a new edit to the shared frames in place, so a correction is
+visible at once without reloading anything or invalidating derived indexes.
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from corpus_edits import apply_edits, get_edit_store
+
+# Copy-on-Write is always on from pandas 3; before that it is opt-in
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+ARROW_SUFFIX = ".arrow"
+# Corpora read at the same time when the combined corpus is built
+LOAD_WORKERS = 8
+
+# path -> (mtime, DataFrame)
+_corpora = {}
+_registry_lock = threading.Lock()
+# One lock per path so different corpora can load at the same time
+_path_locks = {}
+
+
+def _path_lock(path):
+    with _registry_lock:
+        lock = _path_locks.get(path)
+        if lock is None:
+            lock = _path_locks[path] = threading.Lock()
+        return lock
+
+
+def arrow_path(path):
+    """Arrow file that stands in for a corpus pickle"""
+    return os.path.splitext(path)[0] + ARROW_SUFFIX
+
+
+@lru_cache(maxsize=None)
+def _arrow_available():
+    try:
+        import pyarrow.feather  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _source(path):
+    """(file to read, its mtime) for a corpus: the Arrow copy when it is current, else the pickle.
+
+    Raises OSError when neither exists.
+    """
+    arrow = arrow_path(path)
+    if arrow != path and os.path.exists(arrow) and _arrow_available():
+        arrow_mtime = os.path.getmtime(arrow)
+        try:
+            pickle_mtime = os.path.getmtime(path)
+        except OSError:
+            pickle_mtime = None
+        if pickle_mtime is None or arrow_mtime >= pickle_mtime:
+            return arrow, arrow_mtime
+    return path, os.path.getmtime(path)
+
+
+def source_mtime(path):
+    """mtime of the file a corpus loads from, or None if there is none"""
+    try:
+        return _source(path)[1]
+    except OSError:
+        return None
+
+
+def _read(source):
+    if source.endswith(ARROW_SUFFIX):
+        from pyarrow import feather
+
+        # Memory-mapped and zero-copy: ArrowDtype columns keep pointing into the mapping
+        return feather.read_table(source, memory_map=True).to_pandas(types_mapper=pd.ArrowDtype)
+    return pd.read_pickle(source)
+
+
+def _load_shared(path):
+    """Return (mtime, DataFrame) for the path, reading the file only when it changed"""
+    source, mtime = _source(path)
+    entry = _corpora.get(path)
+    if entry is not None and entry[0] == mtime:
+        return entry
+
+    with _path_lock(path):
+        entry = _corpora.get(path)
+        if entry is None or entry[0] != mtime:
+            entry = (mtime, apply_edits(path, _read(source)))
+            _corpora[path] = entry
+        return entry
+
+
+def get_corpus(path):
+    """Return a read-only view of the corpus pickled at `path`.
+
+    Raises OSError when the file does not exist and whatever pandas raises when
+    it cannot be unpickled; callers decide how to fall back.
+    """
+    _, df = _load_shared(path)
+    return df.copy(deep=False)
+
+
+def invalidate_corpus(path=None):
+    """Drop one cached corpus (or all of them) so the next access reloads from disk"""
+    with _registry_lock:
+        if path is None:
+            _corpora.clear()
+        else:
+            _corpora.pop(path, None)
+
+
+class CombinedCorpus:
+    """All lyricists' songs in one frame, built once per set of source files.
+
+    `frame` has a categorical `lyricist` column and a `song_id` that stays the
+    same across rebuilds (source file stem plus 1-based row number). Each
+    lyricist's rows are contiguous, so `ranges` maps a lyricist to the
+    [start, stop) slice of its rows. `version` identifies the source files it
+    was built from and keys the indexes derived from it.
+    """
+
+    def __init__(self, frame, ranges, version=None, paths=None):
+        self.frame = frame
+        self.ranges = ranges
+        self.version = version
+        # lyricist -> source pickle path
+        self.paths = paths or {}
+
+    @classmethod
+    def build(cls, sources):
+        """Build from a list of (lyricist, path, DataFrame) tuples"""
+        names = [name for name, _, _ in sources]
+        paths = {name: path for name, path, _ in sources}
+        frames, ranges = [], {}
+        start = 0
+        for name, path, df in sources:
+            if df is None or df.empty:
+                continue
+            stem = os.path.splitext(os.path.basename(path))[0]
+            frames.append(df.assign(
+                lyricist=name,
+                song_id=[f"{stem}-{i + 1}" for i in range(len(df))],
+            ))
+            ranges[name] = (start, start + len(df))
+            start += len(df)
+
+        if not frames:
+            return cls(pd.DataFrame(), {}, paths=paths)
+
+        frame = pd.concat(frames, ignore_index=True)
+        frame['lyricist'] = pd.Categorical(frame['lyricist'], categories=names)
+        return cls(frame, ranges, paths=paths)
+
+    def select(self, lyricist):
+        """Rows of one lyricist (or everyone for "All") as a view, without copying"""
+        if lyricist == "All":
+            return self.frame.copy(deep=False)
+        if lyricist not in self.ranges:
+            return pd.DataFrame()
+        start, stop = self.ranges[lyricist]
+        return self.frame.iloc[start:stop]
+
+
+class ResultSet:
+    """Search results as a session keeps them: never the rows themselves.
+
+    A result covering a lyricist's whole corpus is just the lyricist name;
+    anything narrower is a compact array of combined-corpus row IDs in result
+    order. Pages are sliced out of the shared combined frame on demand, so a
+    session holds at most one small integer array however many songs match.
+
+    Row IDs only mean something in the corpus version they came from, so the
+    result remembers it; once the corpus is rebuilt the result is stale and
+    has to be searched again.
+    """
+
+    def __init__(self, lyricist="All", ids=None, size=0, version=None):
+        self.lyricist = lyricist
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int32)
+        self.size = len(self.ids) if self.ids is not None else size
+        self.version = version
+
+    @classmethod
+    def everything(cls, combined, lyricist="All"):
+        """All songs of one lyricist (or everyone), in corpus order"""
+        if lyricist == "All":
+            return cls(lyricist, size=len(combined.frame), version=combined.version)
+        start, stop = combined.ranges.get(lyricist, (0, 0))
+        return cls(lyricist, size=stop - start, version=combined.version)
+
+    def __len__(self):
+        return self.size
+
+    def is_current(self, combined):
+        """Whether the results were found in this version of the combined corpus"""
+        return self.version == combined.version
+
+    def page(self, combined, start, stop):
+        """Rows [start, stop) of the results as a view of the shared frame; empty if stale"""
+        frame = combined.frame
+        if not self.is_current(combined):
+            return frame.iloc[0:0]
+        if self.ids is None:
+            first, last = (0, len(frame)) if self.lyricist == "All" else combined.ranges.get(self.lyricist, (0, 0))
+            return frame.iloc[min(first + start, last):min(first + stop, last)]
+        # IDs stay valid across in-place edits, which keep the corpus version
+        return frame.iloc[self.ids[start:stop]]
+
+
+# (source key, CombinedCorpus)
+_combined = None
+_combined_lock = threading.Lock()
+
+
+def get_combined_corpus(sources):
+    """Return the shared combined corpus, rebuilding it only when a source file changed.
+
+    `sources` is a list of (lyricist, path, loader) tuples; `loader()` returns
+    that lyricist's DataFrame and is only called on a rebuild, for all
+    sources in parallel.
+    """
+    global _combined
+
+    # Read before loading: a file replaced mid-load then no longer matches the key
+    key = tuple((name, path, source_mtime(path)) for name, path, _ in sources)
+    cached = _combined
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _combined_lock:
+        cached = _combined
+        if cached is None or cached[0] != key:
+            # Corpora load concurrently (unpickling and Arrow reads mostly release the GIL)
+            with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, max(len(sources), 1))) as pool:
+                frames = list(pool.map(lambda source: source[2](), sources))
+            combined = CombinedCorpus.build([(name, path, df) for (name, path, _), df in zip(sources, frames)])
+            combined.version = key
+            cached = _combined = (combined.version, combined)
+        return cached[1]
+
+
+def update_cell(path, row, column, value):
+    """Durably record an edit to one cell of a pickle and apply it to the shared frames.
+
+    The edit goes to the SQLite overlay first, then into the shared frame of
+    that pickle and the combined corpus. Copy-on-Write leaves the views
+    sessions already hold untouched. Returns the row's combined-corpus ID,
+    or None if the combined corpus doesn't include that pickle.
+    """
+    store = get_edit_store()
+    if store is None:
+        raise OSError(f"Could not open the edits overlay for {path}")
+    store.record(path, row, column, value)
+
+    with _path_lock(path):
+        entry = _corpora.get(path)
+        if entry is not None and column in entry[1].columns:
+            entry[1].iat[row, entry[1].columns.get_loc(column)] = value
+
+    with _combined_lock:
+        if _combined is None:
+            return None
+        combined = _combined[1]
+        for name, source in combined.paths.items():
+            if source == path and name in combined.ranges:
+                doc_id = combined.ranges[name][0] + row
+                if column in combined.frame.columns:
+                    combined.frame.iat[doc_id, combined.frame.columns.get_loc(column)] = value
+                return doc_id
+        return None
+
+
+def convert_to_arrow(path):
+    """Write the Arrow copy of a corpus pickle and return its path.
+
+    The file is uncompressed so it can be memory-mapped, and written to a
+    temporary name first so readers never see a partial file.
+    """
+    from pyarrow import feather
+
+    df = pd.read_pickle(path).reset_index(drop=True)
+    # Mixed object columns (text with NaN or numbers) are stored as text
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].map(lambda value: value if value is None or isinstance(value, str) or pd.isna(value) else str(value))
+    target = arrow_path(path)
+    tmp_path = f"{target}.tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, target)
+    return target
+
+
+def main():
+    paths = sys.argv[1:] or sorted(
+        os.path.join("songs", name) for name in os.listdir("songs")
+        if name.endswith(".pkl") and not name.endswith("_suffix.pkl") and name != "lyrics_index.pkl"
+    )
+    for path in paths:
+        print(f"{path} -> {convert_to_arrow(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Durable local edits layered on top of the song pickles.
+
+Admin corrections (so far only `youtube_url`) are written to a small SQLite
+overlay instead of rewriting a pickle or round-tripping through the Google
+Sheet. Each edit is one row keyed by (pickle path, row number, column), so
+writing it is a single atomic upsert, and the overlay is applied every time
+a pickle is (re)loaded. Edits remember whether they have reached the sheet
+yet; `sync_edits` pushes the pending ones out in batches whenever a sheet
+writer is available.
+
+The sheet writer needs the optional `gspread` package and a service account
+file named by RABINDRAGPT_SHEETS_CREDENTIALS; without them edits simply stay
+pending.
+"""
+
+import importlib.util
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+EDITS_PATH = os.getenv("RABINDRAGPT_CORPUS_EDITS", "songs/edits.sqlite")
+SHEETS_CREDENTIALS = os.getenv("RABINDRAGPT_SHEETS_CREDENTIALS")
+SYNC_BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS edits (
+    path TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    value TEXT,
+    edited REAL NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (path, row, column)
+)
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class EditStore:
+    """SQLite overlay of cell edits, last write wins"""
+
+    def __init__(self, path=EDITS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    def record(self, path, row, column, value):
+        """Store one edit; it is durable once this returns"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO edits (path, row, column, value, edited, synced) VALUES (?, ?, ?, ?, ?, 0)",
+                (path, int(row), column, value, time.time()),
+            )
+
+    def edits_for(self, path):
+        """[(row, column, value)] of every edit to one pickle"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT row, column, value FROM edits WHERE path = ? ORDER BY row", (path,)
+            ).fetchall()
+
+    def pending(self, limit=SYNC_BATCH_SIZE, offset=0):
+        """[(path, row, column, value, edited)] not yet pushed to the sheet, oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, row, column, value, edited FROM edits WHERE synced = 0"
+                " ORDER BY edited, path, row, column LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM edits WHERE synced = 0").fetchone()[0]
+
+    def mark_synced(self, edits):
+        """Mark pushed edits as synced, unless they were edited again in the meantime"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE edits SET synced = 1 WHERE path = ? AND row = ? AND column = ? AND edited = ?",
+                [(path, row, column, edited) for path, row, column, _, edited in edits],
+            )
+
+
+def get_edit_store():
+    """Process-wide edit store, or None if the overlay file can't be opened"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = EditStore()
+            except (OSError, sqlite3.Error):
+                return None
+        return _store
+
+
+def apply_edits(path, df):
+    """Apply the recorded edits of one pickle to a freshly loaded frame, in place"""
+    if not os.path.exists(EDITS_PATH):
+        return df
+    store = get_edit_store()
+    if store is None:
+        return df
+    for row, column, value in store.edits_for(path):
+        if column in df.columns and 0 <= row < len(df):
+            df.iat[row, df.columns.get_loc(column)] = value
+    return df
+
+
+def sheet_sync_available():
+    """Whether sheet_writer can be set up here"""
+    return bool(SHEETS_CREDENTIALS) and importlib.util.find_spec("gspread") is not None
+
+
+def sheet_writer(sheets):
+    """Return push(edits) that writes edits to their Google Sheets, or None if that isn't set up.
+
+    `sheets` maps a pickle path to its (spreadsheet id, worksheet gid).
+    push returns the (path, row, column) keys it wrote; edits it can't place
+    in a sheet are logged and left out.
+    """
+    if not sheet_sync_available():
+        return None
+    import gspread
+    from gspread.utils import rowcol_to_a1
+
+    client = gspread.service_account(filename=SHEETS_CREDENTIALS)
+
+    def push(edits):
+        by_sheet = {}
+        for path, row, column, value, _ in edits:
+            if path in sheets:
+                by_sheet.setdefault(sheets[path], []).append((path, row, column, value))
+            else:
+                logger.warning("Not syncing edit of %s row %s %s: no sheet is registered for it", path, row, column)
+        written = []
+        for (sheet_id, gid), cells in by_sheet.items():
+            worksheet = client.open_by_key(sheet_id).get_worksheet_by_id(int(gid))
+            header = worksheet.row_values(1)
+            updates, keys = [], []
+            for path, row, column, value in cells:
+                if column not in header:
+                    logger.warning("Not syncing edit of %s row %s: the sheet has no %r column", path, row, column)
+                    continue
+                # Row 1 is the header, and pickle rows are 0-based
+                updates.append({'range': rowcol_to_a1(row + 2, header.index(column) + 1), 'values': [[value or ""]]})
+                keys.append((path, row, column))
+            if updates:
+                worksheet.batch_update(updates)
+                written.extend(keys)
+        return written
+
+    return push
+
+
+def sync_edits(push, batch_size=SYNC_BATCH_SIZE):
+    """Push pending edits in batches and return how many were synced.
+
+    Only the edits push reports as written are marked synced; the rest stay
+    pending and are skipped over for the remainder of this run.
+    """
+    store = get_edit_store()
+    if store is None:
+        return 0
+    synced = skipped = 0
+    while True:
+        batch = store.pending(batch_size, offset=skipped)
+        if not batch:
+            return synced
+        written = set(push(batch))
+        done = [edit for edit in batch if edit[:3] in written]
+        store.mark_synced(done)
+        synced += len(done)
+        skipped += len(batch) - len(done)
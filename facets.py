@@ -0,0 +1,233 @@
+"""Precomputed metadata facets of the combined song corpus.
+
+The raga and tala pickers need every distinct value with its song count,
+and the tala picker narrows to the talas that occur with the selected raga.
+Both come from tables built once per corpus version and lyricist range, so
+a rerun only looks values up instead of rescanning the DataFrame.
+
+Filtering uses the same precomputed data: a sorted document ID array per
+metadata value and a composition year per song. `filter_ids` narrows a
+candidate ID array (keyword matches in rank order, or a lyricist's rows)
+with those, so a search allocates a few small integer arrays instead of a
+new DataFrame per filter.
+"""
+
+import re
+import threading
+
+import numpy as np
+
+RAGA = 'রাগ'
+TALA = 'তাল'
+NOTATOR = 'স্বরলিপিকার'
+YEAR = 'রচনাকাল (খৃষ্টাব্দ)'
+YOUTUBE = 'youtube_url'
+FACET_COLUMNS = (RAGA, TALA, NOTATOR)
+# (column, narrowed column) pairs with co-occurrence counts
+FACET_PAIRS = ((RAGA, TALA),)
+
+# Placeholders the sheets use for unknown metadata
+_MISSING = {"", "?", "nan"}
+# Years are written as "1,883" or "৭ অগাস্ট, ১৯৩৫"
+_BENGALI_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+_YEAR_PATTERN = re.compile(r"(?<!\d)(1[5-9]\d\d|20\d\d)(?!\d)")
+
+# Every cache below holds entries of the current corpus version only; the
+# first lookup with a new version drops the rest, see _current
+
+# corpus version -> {column: {value: sorted doc IDs}}
+_value_ids = {}
+_value_ids_lock = threading.Lock()
+# corpus version -> composition year per document, 0 where unknown
+_years = {}
+_years_lock = threading.Lock()
+# corpus version -> sorted IDs of the songs without a YouTube link
+_missing_links = {}
+_missing_links_lock = threading.Lock()
+# (corpus version, doc range) -> FacetTable
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _current(cache, version, key=lambda entry: entry):
+    """Evict the entries of other corpus versions; call with the cache's lock held"""
+    for entry in [entry for entry in cache if key(entry) != version]:
+        del cache[entry]
+
+
+def is_known(value):
+    """Whether a metadata cell holds a real value rather than a placeholder"""
+    return isinstance(value, str) and value.strip() not in _MISSING
+
+
+def value_ids(combined, column):
+    """Document IDs for every value of a metadata column, built once per corpus version"""
+    with _value_ids_lock:
+        _current(_value_ids, combined.version)
+        tables = _value_ids.setdefault(combined.version, {})
+        if column not in tables:
+            values = combined.frame[column] if column in combined.frame else []
+            groups = {}
+            for doc_id, value in enumerate(values):
+                if isinstance(value, str):
+                    groups.setdefault(value, []).append(doc_id)
+            tables[column] = {value: np.array(ids, dtype=np.int64) for value, ids in groups.items()}
+        return tables[column]
+
+
+def parse_year(value):
+    """Composition year in a metadata cell, or 0 if it has none"""
+    if not is_known(value):
+        return 0
+    match = _YEAR_PATTERN.search(value.translate(_BENGALI_DIGITS).replace(",", ""))
+    return int(match.group(1)) if match else 0
+
+
+def document_years(combined):
+    """Composition year of every document (0 where unknown), built once per corpus version"""
+    with _years_lock:
+        _current(_years, combined.version)
+        years = _years.get(combined.version)
+        if years is None:
+            values = combined.frame[YEAR] if YEAR in combined.frame else []
+            years = np.fromiter((parse_year(value) for value in values), dtype=np.int32, count=len(values))
+            years.setflags(write=False)
+            _years[combined.version] = years
+        return years
+
+
+def has_link(value):
+    """Whether a youtube_url cell holds a usable link"""
+    return isinstance(value, str) and value.strip().startswith('http')
+
+
+def missing_link_ids(combined):
+    """Sorted IDs of the songs without a YouTube link, built once per corpus version"""
+    with _missing_links_lock:
+        _current(_missing_links, combined.version)
+        ids = _missing_links.get(combined.version)
+        if ids is None:
+            if YOUTUBE in combined.frame:
+                ids = np.flatnonzero(~combined.frame[YOUTUBE].map(has_link).to_numpy(dtype=bool))
+            else:
+                ids = np.arange(len(combined.frame))
+            ids = ids.astype(np.int64)
+            ids.setflags(write=False)
+            _missing_links[combined.version] = ids
+        return ids
+
+
+def update_link(combined, doc_id, value):
+    """Keep the missing-link IDs current after one song's youtube_url was edited in place"""
+    with _missing_links_lock:
+        ids = _missing_links.get(combined.version)
+        if ids is None:
+            return
+        ids = ids[ids != doc_id]
+        if not has_link(value):
+            ids = np.insert(ids, np.searchsorted(ids, doc_id), doc_id)
+        ids.setflags(write=False)
+        _missing_links[combined.version] = ids
+
+
+def _members(sorted_ids, candidates):
+    """Mask of the candidates that appear in a sorted ID array"""
+    if len(sorted_ids) == 0:
+        return np.zeros(len(candidates), dtype=bool)
+    positions = np.searchsorted(sorted_ids, candidates).clip(max=len(sorted_ids) - 1)
+    return sorted_ids[positions] == candidates
+
+
+def filter_ids(combined, candidates=None, doc_range=None, values=None, year_range=None):
+    """Candidate document IDs that pass every filter, in their original order.
+
+    `candidates` defaults to every row of `doc_range`. `values` maps a
+    metadata column to the one value it must have; `year_range` is an
+    inclusive (first, last) composition year, and songs without a known
+    year are dropped by it.
+    """
+    start, stop = doc_range if doc_range is not None else (0, len(combined.frame))
+    if candidates is None:
+        ids = np.arange(start, stop, dtype=np.int64)
+    else:
+        ids = np.asarray(candidates, dtype=np.int64)
+        ids = ids[(ids >= start) & (ids < stop)]
+
+    for column, value in (values or {}).items():
+        if len(ids) == 0:
+            break
+        ids = ids[_members(value_ids(combined, column).get(value, np.zeros(0, dtype=np.int64)), ids)]
+    if year_range is not None and len(ids):
+        years = document_years(combined)[ids]
+        ids = ids[(years >= year_range[0]) & (years <= year_range[1])]
+    return ids
+
+
+class FacetTable:
+    """Distinct values and song counts of the facet columns over one set of rows"""
+
+    def __init__(self, counts, pair_counts, years=(0, 0)):
+        # column -> [(value, songs)] in sorted value order
+        self.counts = counts
+        # (column, other) -> {value: [(other value, songs)]}
+        self.pair_counts = pair_counts
+        # (first, last) known composition year, (0, 0) when none is known
+        self.years = years
+
+    @classmethod
+    def build(cls, frame, columns=FACET_COLUMNS, pairs=FACET_PAIRS, years=None):
+        counts = {}
+        for column in columns:
+            if column not in frame:
+                counts[column] = []
+                continue
+            values = frame[column]
+            values = values[values.map(is_known)]
+            counts[column] = sorted(values.value_counts().items())
+
+        pair_counts = {}
+        for column, other in pairs:
+            table = {}
+            if column in frame and other in frame:
+                both = frame[[column, other]]
+                both = both[both[column].map(is_known) & both[other].map(is_known)]
+                for (value, other_value), songs in sorted(both.groupby([column, other], observed=True).size().items()):
+                    table.setdefault(value, []).append((other_value, songs))
+            pair_counts[(column, other)] = table
+
+        known_years = years[years > 0] if years is not None else []
+        year_span = (int(known_years.min()), int(known_years.max())) if len(known_years) else (0, 0)
+        return cls(counts, pair_counts, year_span)
+
+    def options(self, column):
+        """Distinct known values, sorted"""
+        return [value for value, _ in self.counts.get(column, [])]
+
+    def song_counts(self, column):
+        """{value: number of songs} for labelling options"""
+        return dict(self.counts.get(column, []))
+
+    def narrowed(self, column, value, other):
+        """[(other value, songs)] among the songs whose `column` is `value`"""
+        return self.pair_counts.get((column, other), {}).get(value, [])
+
+
+def get_facet_table(combined, doc_range=None):
+    """Facet table for a lyricist's rows (or the whole corpus), built once per corpus version"""
+    key = (combined.version, doc_range)
+    with _tables_lock:
+        _current(_tables, combined.version, key=lambda entry: entry[0])
+        table = _tables.get(key)
+        if table is None:
+            start, stop = doc_range if doc_range is not None else (0, len(combined.frame))
+            table = FacetTable.build(combined.frame.iloc[start:stop], years=document_years(combined)[start:stop])
+            _tables[key] = table
+        return table
+
+
+def option_label(value, counts):
+    """'value (n songs)' for a facet option; values without a count are shown as is"""
+    songs = counts.get(value)
+    if songs is None:
+        return value
+    return f"{value} ({songs} {'song' if songs == 1 else 'songs'})"
@@ -0,0 +1,280 @@
+"""Long-lived text generation client shared by every session in the process.
+
+The client owns one backend for the process lifetime. The Gemini backend
+configures the SDK once and keeps one GenerativeModel handle per generation
+config, so repeated requests reuse the SDK's persistent channel instead of
+setting up a new model and connection every time. The HTTP backend talks to
+a local stand-in server over a pooled keep-alive session, which lets us load
+test the app without spending API quota.
+
+Pick the backend with RABINDRAGPT_GENERATION_BACKEND: "gemini" (default) or
+the base URL of a stand-in server, e.g. "http://localhost:8000".
+"""
+
+import codecs
+import json
+import os
+import threading
+from concurrent.futures import as_completed
+
+from generation_service import GenerationBusy, GenerationService
+from response_cache import get_response_cache, is_cacheable
+
+GEMINI_MODEL = 'models/gemini-1.5-flash'
+GENERATION_BACKEND = os.getenv("RABINDRAGPT_GENERATION_BACKEND", "gemini")
+
+BUSY_MESSAGE = "⚠️ Too many poems are being written right now. Please try again in a moment."
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class GenerationBackend:
+    """Interface every generation backend implements"""
+
+    # Part of the response cache key, so backends never share cached text
+    model_name = None
+
+    def generate(self, prompt, temperature, max_tokens):
+        """Return the full generated text"""
+        raise NotImplementedError
+
+    def stream(self, prompt, temperature, max_tokens):
+        """Yield the generated text in chunks; the default yields it in one piece"""
+        yield self.generate(prompt, temperature, max_tokens)
+
+
+def gemini_response_text(response):
+    """Extract the generated text from a Gemini response, or a ⚠️ message explaining why there is none"""
+    # Robust error handling for Gemini responses
+    try:
+        if hasattr(response, 'text') and response.text:
+            return response.text
+        # Fallback: try to extract from parts
+        if hasattr(response, 'candidates') and response.candidates:
+            for candidate in response.candidates:
+                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
+                    for part in candidate.content.parts:
+                        if hasattr(part, 'text') and part.text:
+                            return part.text
+        # If finish_reason is 2 (SAFETY), show a warning
+        if hasattr(response, 'candidates') and response.candidates:
+            for candidate in response.candidates:
+                if hasattr(candidate, 'finish_reason') and candidate.finish_reason == 2:
+                    return "⚠️ Gemini refused to generate content due to safety filters. Try a different prompt."
+        return "⚠️ No response generated. Try a different prompt."
+    except Exception as e:
+        return f"⚠️ Error: {e}"
+
+
+class GeminiBackend(GenerationBackend):
+    """Google Gemini through the google-generativeai SDK"""
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL):
+        import google.generativeai as genai
+
+        self.genai = genai
+        self.model_name = model_name
+        genai.configure(api_key=api_key)
+        self._models = {}
+        self._models_lock = threading.Lock()
+
+    def _model(self, temperature, max_tokens):
+        """GenerativeModel handle for one generation config, created once and reused"""
+        key = (temperature, max_tokens)
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self.genai.GenerativeModel(self.model_name, generation_config={
+                    'temperature': temperature,
+                    'max_output_tokens': max_tokens
+                })
+                self._models[key] = model
+            return model
+
+    def generate(self, prompt, temperature, max_tokens):
+        response = self._model(temperature, max_tokens).generate_content(prompt)
+        return gemini_response_text(response)
+
+    async def agenerate(self, prompt, temperature, max_tokens):
+        response = await self._model(temperature, max_tokens).generate_content_async(prompt)
+        return gemini_response_text(response)
+
+    def stream(self, prompt, temperature, max_tokens):
+        response = self._model(temperature, max_tokens).generate_content(prompt, stream=True)
+        produced = False
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a safety stop) raise on .text
+                text = ""
+            if text:
+                produced = True
+                yield text
+        if not produced:
+            yield gemini_response_text(response)
+
+
+class HTTPBackend(GenerationBackend):
+    """Stand-in generation server reached over pooled keep-alive HTTP connections.
+
+    The server takes POST {base_url}/generate with a JSON body
+    {"prompt", "temperature", "max_tokens", "stream"} and answers with
+    {"text": ...}, or with plain text chunks when "stream" is true.
+    """
+
+    def __init__(self, base_url, pool_size=32, timeout=120):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.model_name = f"http:{self.base_url}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, prompt, temperature, max_tokens, stream):
+        response = self.session.post(
+            f"{self.base_url}/generate",
+            data=json.dumps({'prompt': prompt, 'temperature': temperature, 'max_tokens': max_tokens, 'stream': stream}),
+            headers={'Content-Type': 'application/json'},
+            timeout=self.timeout,
+            stream=stream,
+        )
+        response.raise_for_status()
+        return response
+
+    def generate(self, prompt, temperature, max_tokens):
+        return self._post(prompt, temperature, max_tokens, stream=False).json().get('text', '')
+
+    def stream(self, prompt, temperature, max_tokens):
+        # Chunk boundaries can split a multi-byte Bengali character
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with self._post(prompt, temperature, max_tokens, stream=True) as response:
+            for chunk in response.iter_content(chunk_size=None):
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield text
+
+
+class GenerationClient:
+    """Process-wide entry point for generation.
+
+    The response cache sits in front; misses go through the generation
+    service, which bounds concurrency and retries rate limits, to one backend.
+    """
+
+    def __init__(self, backend, service=None):
+        self.backend = backend
+        self.service = service or GenerationService()
+
+    def _cache(self, temperature, use_cache):
+        return get_response_cache() if use_cache and is_cacheable(temperature) else None
+
+    def generate(self, prompt, temperature=0.8, max_tokens=500, use_cache=True, session_id=None):
+        """Generated text, reusing a cached response for a repeated prompt and config"""
+        cache = self._cache(temperature, use_cache)
+        if cache is not None:
+            cached = cache.get(self.backend.model_name, prompt, temperature, max_tokens)
+            if cached is not None:
+                return cached
+
+        try:
+            text = self.service.generate(session_id, self.backend, prompt, temperature, max_tokens)
+        except GenerationBusy:
+            return BUSY_MESSAGE
+        except Exception as e:
+            return f"⚠️ Error: {e}"
+
+        # Never cache refusals or errors
+        if cache is not None and text and not text.startswith("⚠️"):
+            cache.put(self.backend.model_name, prompt, temperature, max_tokens, text)
+        return text
+
+    def store(self, prompt, temperature, max_tokens, text, variant=0):
+        """Cache a response obtained with use_cache=False, replacing any earlier entry"""
+        cache = self._cache(temperature, True)
+        if cache is not None and text and not text.startswith("⚠️"):
+            cache.put(self.backend.model_name, prompt, temperature, max_tokens, text, variant)
+
+    def generate_many(self, prompt, n, temperature=0.8, max_tokens=500, use_cache=True, session_id=None):
+        """Request n alternative responses at once and yield (variant, text) as each one finishes.
+
+        Every variant has its own cache entry, so repeating a batch request
+        returns the same set of alternatives.
+        """
+        cache = self._cache(temperature, use_cache)
+        pending = {}
+        for variant in range(n):
+            cached = cache.get(self.backend.model_name, prompt, temperature, max_tokens, variant) if cache is not None else None
+            if cached is not None:
+                yield variant, cached
+                continue
+            future = self.service.submit(session_id, self.backend, prompt, temperature, max_tokens)
+            pending[future] = variant
+
+        for future in as_completed(pending):
+            variant = pending[future]
+            try:
+                text = future.result()
+            except GenerationBusy:
+                yield variant, BUSY_MESSAGE
+                continue
+            except Exception as e:
+                yield variant, f"⚠️ Error: {e}"
+                continue
+            if cache is not None and text and not text.startswith("⚠️"):
+                cache.put(self.backend.model_name, prompt, temperature, max_tokens, text, variant)
+            yield variant, text
+
+    def stream(self, prompt, temperature=0.8, max_tokens=500, use_cache=True, session_id=None):
+        """Yield generated text in chunks; the complete text is cached once the stream ends"""
+        cache = self._cache(temperature, use_cache)
+        if cache is not None:
+            cached = cache.get(self.backend.model_name, prompt, temperature, max_tokens)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        try:
+            for chunk in self.service.stream(session_id, self.backend, prompt, temperature, max_tokens):
+                parts.append(chunk)
+                yield chunk
+        except GenerationBusy:
+            yield BUSY_MESSAGE
+            return
+        except Exception as e:
+            yield f"⚠️ Error: {e}"
+            return
+
+        text = "".join(parts)
+        if cache is not None and text and not text.startswith("⚠️"):
+            cache.put(self.backend.model_name, prompt, temperature, max_tokens, text)
+
+
+def create_backend(spec=GENERATION_BACKEND):
+    """Backend for a RABINDRAGPT_GENERATION_BACKEND value"""
+    if spec.startswith(("http://", "https://")):
+        return HTTPBackend(spec)
+    return GeminiBackend(os.getenv("GEMINI_API_KEY"))
+
+
+def get_generation_client():
+    """The process-wide generation client, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GenerationClient(create_backend())
+        return _client
+
+
+def uses_gemini():
+    """Whether the configured backend needs a Gemini API key"""
+    return not GENERATION_BACKEND.startswith(("http://", "https://"))
@@ -0,0 +1,188 @@
+"""Asyncio scheduler that every generation request goes through.
+
+One event loop runs on a background thread for the whole process. Requests
+wait in per-session queues, and a dispatcher hands out at most
+`max_concurrency` slots, round-robin across sessions with at most
+`per_session_limit` slots per session, so one impatient user can't starve
+everybody else. A request that can't get a slot within `queue_timeout`
+fails fast with GenerationBusy instead of piling up. Rate-limit errors are
+retried with full-jitter exponential backoff, so a burst of 429s doesn't
+turn into a synchronized retry storm.
+
+Streamlit script threads only block on the result of their own request; the
+backend calls themselves run as coroutines (or on a small pool sized to the
+concurrency limit, for backends without an async API).
+"""
+
+import asyncio
+import os
+import queue
+import random
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENCY = int(os.getenv("RABINDRAGPT_MAX_CONCURRENT_GENERATIONS", "8"))
+PER_SESSION_LIMIT = 2
+QUEUE_TIMEOUT_SECONDS = 60.0
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 20.0
+
+_DONE = object()
+
+
+class GenerationBusy(Exception):
+    """No generation slot became free within the queue timeout"""
+
+
+def is_rate_limit_error(error):
+    """Whether an exception from a backend means "slow down" (HTTP 429 / ResourceExhausted)"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    code = getattr(error, 'code', None)
+    return status == 429 or code == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+class GenerationService:
+    """Bounded, per-session fair scheduler for backend calls.
+
+    Scheduler state is only touched from the event loop thread, so it needs
+    no locks.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_session_limit=PER_SESSION_LIMIT,
+                 queue_timeout=QUEUE_TIMEOUT_SECONDS, max_retries=MAX_RETRIES,
+                 retry_base_delay=RETRY_BASE_DELAY, retry_max_delay=RETRY_MAX_DELAY):
+        self.max_concurrency = max_concurrency
+        self.per_session_limit = per_session_limit
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self._waiting = OrderedDict()  # session -> deque of waiter futures
+        self._active = {}  # session -> slots held
+        self._running = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="generation")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="generation-service", daemon=True)
+        self._thread.start()
+
+    # --- slot scheduling (event loop thread only) ---
+
+    def _dispatch(self):
+        """Grant free slots to waiting sessions, round-robin"""
+        while self._running < self.max_concurrency:
+            granted = False
+            for session_id in list(self._waiting):
+                waiters = self._waiting[session_id]
+                while waiters and waiters[0].done():
+                    waiters.popleft()
+                if not waiters:
+                    del self._waiting[session_id]
+                    continue
+                if self._active.get(session_id, 0) >= self.per_session_limit:
+                    continue
+                waiters.popleft().set_result(None)
+                self._running += 1
+                self._active[session_id] = self._active.get(session_id, 0) + 1
+                # Served sessions go to the back of the line
+                self._waiting.move_to_end(session_id)
+                granted = True
+                break
+            if not granted:
+                return
+
+    async def _acquire(self, session_id):
+        waiter = self._loop.create_future()
+        self._waiting.setdefault(session_id, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot arrived just as we gave up; hand it back
+                self._release(session_id)
+            else:
+                waiter.cancel()
+            raise GenerationBusy() from None
+
+    def _release(self, session_id):
+        self._running -= 1
+        remaining = self._active.get(session_id, 1) - 1
+        if remaining > 0:
+            self._active[session_id] = remaining
+        else:
+            self._active.pop(session_id, None)
+        self._dispatch()
+
+    async def _backoff(self, attempt):
+        # Full jitter: anywhere between 0 and the exponential cap
+        await asyncio.sleep(random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)))
+
+    # --- request coroutines ---
+
+    async def _generate(self, session_id, backend, prompt, temperature, max_tokens):
+        await self._acquire(session_id)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if hasattr(backend, 'agenerate'):
+                        return await backend.agenerate(prompt, temperature, max_tokens)
+                    return await self._loop.run_in_executor(
+                        self._executor, backend.generate, prompt, temperature, max_tokens
+                    )
+                except Exception as e:
+                    if attempt == self.max_retries or not is_rate_limit_error(e):
+                        raise
+                await self._backoff(attempt)
+        finally:
+            self._release(session_id)
+
+    async def _stream(self, session_id, backend, prompt, temperature, max_tokens, chunks):
+        await self._acquire(session_id)
+        started = threading.Event()
+
+        def pump():
+            for chunk in backend.stream(prompt, temperature, max_tokens):
+                started.set()
+                chunks.put(chunk)
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await self._loop.run_in_executor(self._executor, pump)
+                except Exception as e:
+                    # Once text reached the user a retry would duplicate it
+                    if started.is_set() or attempt == self.max_retries or not is_rate_limit_error(e):
+                        raise
+                await self._backoff(attempt)
+        finally:
+            self._release(session_id)
+
+    # --- blocking entry points for script threads ---
+
+    def generate(self, session_id, backend, prompt, temperature, max_tokens):
+        """Run one generation through the scheduler and wait for its text"""
+        return self.submit(session_id, backend, prompt, temperature, max_tokens).result()
+
+    def submit(self, session_id, backend, prompt, temperature, max_tokens):
+        """Queue one generation and return a concurrent.futures.Future for its text"""
+        return asyncio.run_coroutine_threadsafe(
+            self._generate(session_id, backend, prompt, temperature, max_tokens), self._loop
+        )
+
+    def stream(self, session_id, backend, prompt, temperature, max_tokens):
+        """Run one streamed generation through the scheduler, yielding chunks as they arrive"""
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(session_id, backend, prompt, temperature, max_tokens, chunks), self._loop
+        )
+        future.add_done_callback(lambda _: chunks.put(_DONE))
+        while True:
+            chunk = chunks.get()
+            if chunk is _DONE:
+                break
+            yield chunk
+        future.result()
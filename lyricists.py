@@ -0,0 +1,126 @@
+"""Registry of lyricists and their song corpora, read from lyricists.json.
+
+Every lyricist is one entry: a name, and for those whose songs are in the
+app, the corpus file and the Google Sheet it is built from. Loading,
+indexing, the build command and the sheet sync all iterate over the entries,
+so onboarding a lyricist is a config change plus a build. Entries without a
+corpus are listed in the lyricist picker as "coming soon".
+
+    {"name": "Kazi Nazrul Islam", "corpus": "songs/nazrul.pkl",
+     "sheet": {"id": "<spreadsheet id>", "gid": "<worksheet gid>"}}
+
+Point RABINDRAGPT_LYRICISTS at another file to use a different registry.
+"""
+
+import json
+import os
+import threading
+
+import pandas as pd
+
+from corpus import get_combined_corpus, get_corpus
+
+REGISTRY_PATH = os.getenv("RABINDRAGPT_LYRICISTS", "lyricists.json")
+
+# (path, mtime) -> Registry
+_registry = None
+_registry_lock = threading.Lock()
+# corpus path -> why it could not be loaded the last time it was read
+_load_errors = {}
+_load_errors_lock = threading.Lock()
+
+
+class Source:
+    """One corpus file and the sheet it is built from"""
+
+    def __init__(self, corpus, sheet_id=None, gid=None):
+        self.corpus = corpus
+        self.sheet_id = sheet_id
+        self.gid = gid
+
+    @classmethod
+    def from_config(cls, entry):
+        sheet = entry.get('sheet') or {}
+        return cls(entry['corpus'], sheet.get('id'), str(sheet.get('gid', "0")))
+
+
+class Lyricist:
+    """A registry entry; `source` is None until the lyricist's songs are added"""
+
+    def __init__(self, name, source=None):
+        self.name = name
+        self.source = source
+
+    @property
+    def has_songs(self):
+        return self.source is not None
+
+
+class Registry:
+    def __init__(self, lyricists, dictionary=None):
+        self.lyricists = lyricists
+        self.dictionary = dictionary
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        lyricists = [
+            Lyricist(entry['name'], Source.from_config(entry) if entry.get('corpus') else None)
+            for entry in config.get('lyricists', [])
+        ]
+        dictionary = config.get('dictionary')
+        return cls(lyricists, Source.from_config(dictionary) if dictionary else None)
+
+    def names(self):
+        """Every lyricist, in registry order"""
+        return [lyricist.name for lyricist in self.lyricists]
+
+    def with_songs(self):
+        """Lyricists that have a corpus, in the order they appear in the combined corpus"""
+        return [lyricist for lyricist in self.lyricists if lyricist.has_songs]
+
+    def sheets(self):
+        """{corpus path: (spreadsheet id, worksheet gid)} for every corpus built from a sheet"""
+        sources = [lyricist.source for lyricist in self.with_songs()]
+        if self.dictionary is not None:
+            sources.append(self.dictionary)
+        return {source.corpus: (source.sheet_id, source.gid) for source in sources if source.sheet_id}
+
+
+def get_registry(path=REGISTRY_PATH):
+    """The lyricist registry, re-read only when the config file changes"""
+    global _registry
+    key = (path, os.path.getmtime(path))
+    with _registry_lock:
+        if _registry is None or _registry[0] != key:
+            _registry = (key, Registry.load(path))
+        return _registry[1]
+
+
+def _load_or_empty(path):
+    # A missing or unreadable corpus leaves its lyricist out instead of failing everyone else
+    try:
+        df = get_corpus(path)
+    except Exception as e:
+        with _load_errors_lock:
+            _load_errors[path] = str(e) or type(e).__name__
+        return pd.DataFrame()
+    with _load_errors_lock:
+        _load_errors.pop(path, None)
+    return df
+
+
+def load_errors():
+    """{corpus path: error} for the corpora that failed to load"""
+    with _load_errors_lock:
+        return dict(_load_errors)
+
+
+def load_combined(registry=None):
+    """The shared combined corpus of every registered lyricist with songs"""
+    registry = registry or get_registry()
+    return get_combined_corpus([
+        (lyricist.name, lyricist.source.corpus, lambda path=lyricist.source.corpus: _load_or_empty(path))
+        for lyricist in registry.with_songs()
+    ])
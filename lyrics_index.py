@@ -0,0 +1,225 @@
+"""Inverted full-text index over the lyrics of the combined corpus.
+
+Document IDs are row positions in the combined corpus frame, so a lyricist's
+songs are a contiguous ID range. Every token maps to a posting list of
+(document, term frequency) arrays used for BM25 ranking. A character
+trigram index over the lyrics narrows substring queries (word fragments,
+quoted phrases) to a few candidates that are then verified.
+
+Lyrics are passed through `normalize_text` once when the index is built and
+the normalized text is kept in the index; queries get the same treatment,
+so matching never re-normalizes the corpus.
+"""
+
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from bengali_text import normalize_text
+
+INDEX_VERSION = 3
+
+# Bengali block (letters, vowel signs, hasanta) plus any other word character
+TOKEN_PATTERN = re.compile(r"[\u0980-\u09ff\u200c\u200d\w]+")
+
+# A quoted phrase or a single whitespace-separated word
+_QUERY_WORD_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Query words that join terms; terms without an operator are ANDed
+_OR_WORDS = {"or", "|", "অথবা"}
+_AND_WORDS = {"and", "&", "এবং"}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Loaded indexes shared by every session in the process, keyed by index path
+_loaded_indexes = {}
+_loaded_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Split normalized lyrics or a query into tokens"""
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    """Parse a keyword query into OR-groups of ANDed terms.
+
+    'মেঘ বৃষ্টি OR "শ্রাবণ ঘন"' becomes [["মেঘ", "বৃষ্টি"], ["শ্রাবণ ঘন"]].
+    Quoted phrases are kept whole; other words are split into tokens.
+    """
+    groups, current = [], []
+    for match in _QUERY_WORD_PATTERN.finditer(query):
+        phrase, word = match.groups()
+        if phrase is not None:
+            phrase = normalize_text(phrase)
+            if phrase:
+                current.append(phrase)
+            continue
+        lowered = word.lower()
+        if lowered in _OR_WORDS:
+            if current:
+                groups.append(current)
+            current = []
+        elif lowered in _AND_WORDS:
+            continue
+        else:
+            current.extend(tokenize(normalize_text(word)))
+    if current:
+        groups.append(current)
+    return groups
+
+
+def trigrams(text):
+    """Set of character trigrams in a string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class LyricsIndex:
+    """Token posting lists for BM25 plus trigram posting lists for substring matching"""
+
+    def __init__(self, postings, doc_lengths, texts, trigram_postings):
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self.texts = texts
+        self.trigram_postings = trigram_postings
+
+    @classmethod
+    def build(cls, lyrics):
+        """Build the index from an iterable of lyrics, one per document"""
+        doc_ids, term_freqs, trigram_ids = {}, {}, {}
+        doc_lengths, texts = [], []
+        for doc_id, text in enumerate(lyrics):
+            text = normalize_text(text)
+            texts.append(text)
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                doc_ids.setdefault(token, []).append(doc_id)
+                term_freqs.setdefault(token, []).append(tf)
+            for gram in trigrams(text):
+                trigram_ids.setdefault(gram, []).append(doc_id)
+
+        postings = {
+            token: (np.array(ids, dtype=np.int32), np.array(term_freqs[token], dtype=np.int32))
+            for token, ids in doc_ids.items()
+        }
+        trigram_postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in trigram_ids.items()}
+        return cls(postings, np.array(doc_lengths, dtype=np.int32), texts, trigram_postings)
+
+    def contains(self, fragment, doc_range=None):
+        """IDs of documents containing the fragment, in corpus order.
+
+        Like `str.contains(fragment, case=False, regex=False)` on the normalized
+        lyrics; only documents holding every trigram of the fragment are
+        actually checked.
+        """
+        fragment = normalize_text(fragment)
+        start, stop = doc_range if doc_range is not None else (0, len(self.texts))
+        grams = trigrams(fragment)
+        if grams:
+            postings = sorted((self.trigram_postings.get(gram, ()) for gram in grams), key=len)
+            candidates = np.asarray(postings[0], dtype=np.int32)
+            for ids in postings[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            candidates = candidates[(candidates >= start) & (candidates < stop)]
+        else:
+            # Too short for a trigram: check every document in range
+            candidates = range(start, stop)
+        return np.array([doc_id for doc_id in candidates if fragment in self.texts[doc_id]], dtype=np.int64)
+
+    def _term_scores(self, token):
+        """BM25 contribution of one term, as (doc IDs, scores)"""
+        posting = self.postings.get(token)
+        if posting is None:
+            return np.zeros(0, dtype=np.int32), np.zeros(0)
+        ids, tfs = posting
+        n_docs = len(self.doc_lengths)
+        idf = np.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[ids] / self.avg_doc_length)
+        return ids, idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+    def search(self, query, doc_range=None):
+        """Return matching document IDs, best BM25 score first.
+
+        Each term matches as a substring (see `contains`); whole-word
+        occurrences drive the BM25 ranking. `doc_range` optionally restricts
+        results to a [start, stop) ID range.
+        """
+        return self.scored_search(query, doc_range)[0]
+
+    def scored_search(self, query, doc_range=None):
+        """Like `search`, but returns (document IDs, BM25 scores)"""
+        groups = parse_query(query)
+        empty = np.zeros(0, dtype=np.int64)
+        if not groups:
+            return empty, np.zeros(0)
+
+        # Matches come back sorted, so AND/OR are sorted-array merges
+        result = empty
+        for group in groups:
+            group_ids = None
+            for term in group:
+                ids = self.contains(term, doc_range)
+                group_ids = ids if group_ids is None else np.intersect1d(group_ids, ids, assume_unique=True)
+            result = np.union1d(result, group_ids)
+        if len(result) == 0:
+            return result, np.zeros(0)
+
+        scores = np.zeros(len(result))
+        for token in {token for group in groups for term in group for token in tokenize(term)}:
+            ids, term_scores = self._term_scores(token)
+            if len(ids) == 0:
+                continue
+            positions = np.searchsorted(result, ids)
+            positions[positions == len(result)] = 0
+            hit = result[positions] == ids
+            scores[positions[hit]] += term_scores[hit]
+
+        # Stable sort keeps corpus order among equal scores
+        order = np.argsort(-scores, kind="stable")
+        return result[order], scores[order]
+
+
+def load_lyrics_index(combined, index_path="songs/lyrics_index.pkl"):
+    """Return the lyrics index for the combined corpus, building and saving it on first use"""
+    with _loaded_lock:
+        cached = _loaded_indexes.get(index_path)
+        if cached is not None and cached[0] == combined.version:
+            return cached[1]
+        index = _read_or_build_index(combined, index_path)
+        _loaded_indexes[index_path] = (combined.version, index)
+        return index
+
+
+def _read_or_build_index(combined, index_path):
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "rb") as f:
+                payload = pickle.load(f)
+            if payload.get('version') == INDEX_VERSION and payload.get('source') == combined.version:
+                return payload['index']
+        except Exception:
+            pass
+
+    lyrics = combined.frame['lyrics'] if 'lyrics' in combined.frame else []
+    index = LyricsIndex.build(lyrics)
+
+    try:
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({'version': INDEX_VERSION, 'source': combined.version, 'index': index}, f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+    return index
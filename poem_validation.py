@@ -0,0 +1,125 @@
+"""Local checks on generated poems before they are shown.
+
+The poetry prompt asks for Bengali script only, exactly `length` lines and
+no numbering or bullets. Models sometimes ignore parts of that. Violations
+that can be fixed by editing the text are repaired here without another
+model call:
+
+- numbering and bullet prefixes are stripped;
+- English preambles ("Here is your poem:") and parenthesized translations
+  are dropped;
+- lines beyond the requested count are cut.
+
+Only a poem that is still wrong after that needs a new request: it has too
+few lines, or Latin script mixed into the verse itself. Counters of how
+often each outcome happens are kept for the whole process.
+"""
+
+import re
+import threading
+
+# "১.", "2)", "৩।", "- ", "• " and friends at the start of a line
+_NUMBERING = re.compile(r"^\s*(?:[(\[]?[0-9\u09e6-\u09ef]+[.)\]:।-]|[-*•●▪])\s*")
+_LATIN = re.compile(r"[A-Za-z]")
+_BENGALI = re.compile(r"[\u0980-\u09ff]")
+# "(Love)", "[tr: ...]": an aside in Latin script, usually a translation
+_LATIN_ASIDE = re.compile(r"\s*[(\[][^()\[\]\u0980-\u09ff]*[A-Za-z][^()\[\]\u0980-\u09ff]*[)\]]")
+
+
+class PoemCheck:
+    """Outcome of validating one generated poem"""
+
+    def __init__(self, text, repairs, problems):
+        self.text = text
+        self.repairs = repairs
+        self.problems = problems
+
+    @property
+    def ok(self):
+        return not self.problems
+
+
+def check_poem(text, expected_lines):
+    """Repair what can be repaired locally and report what can't"""
+    repairs, problems = [], []
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            # Stanza breaks are fine; runs of them are collapsed below
+            lines.append("")
+            continue
+        unnumbered = _NUMBERING.sub("", stripped, count=1)
+        if unnumbered != stripped:
+            repairs.append("numbering")
+            stripped = unnumbered.strip()
+        if not _BENGALI.search(stripped):
+            if _LATIN.search(stripped):
+                repairs.append("non-bengali line")
+            continue
+        without_asides = _LATIN_ASIDE.sub("", stripped)
+        if without_asides != stripped:
+            repairs.append("translation")
+            stripped = without_asides.strip()
+        if _LATIN.search(stripped):
+            problems.append("mixed script")
+        lines.append(stripped)
+
+    # Drop leading, trailing and repeated blank lines
+    cleaned = []
+    for line in lines:
+        if line or (cleaned and cleaned[-1]):
+            cleaned.append(line)
+    while cleaned and not cleaned[-1]:
+        cleaned.pop()
+
+    verse_count = sum(1 for line in cleaned if line)
+    if verse_count > expected_lines:
+        repairs.append("extra lines")
+        kept, seen = [], 0
+        for line in cleaned:
+            if line:
+                if seen == expected_lines:
+                    break
+                seen += 1
+            kept.append(line)
+        cleaned = kept
+        while cleaned and not cleaned[-1]:
+            cleaned.pop()
+    elif verse_count < expected_lines:
+        problems.append("too few lines")
+
+    return PoemCheck("\n".join(cleaned), sorted(set(repairs)), sorted(set(problems)))
+
+
+class ValidationStats:
+    """Process-wide counters of validation outcomes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.repaired = 0
+        self.retried = 0
+        self.failed = 0
+
+    def record(self, repaired=False, retried=False, failed=False):
+        with self._lock:
+            self.checked += 1
+            self.repaired += bool(repaired)
+            self.retried += bool(retried)
+            self.failed += bool(failed)
+
+    def rates(self):
+        """Fraction of checked poems that were repaired locally, re-requested, or still invalid"""
+        with self._lock:
+            if not self.checked:
+                return {'checked': 0, 'repair_rate': 0.0, 'retry_rate': 0.0, 'failure_rate': 0.0}
+            return {
+                'checked': self.checked,
+                'repair_rate': self.repaired / self.checked,
+                'retry_rate': self.retried / self.checked,
+                'failure_rate': self.failed / self.checked,
+            }
+
+
+validation_stats = ValidationStats()
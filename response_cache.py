@@ -0,0 +1,131 @@
+"""Persistent cache of model responses, shared by every session and process.
+
+Responses are stored in SQLite keyed by a hash of the model, prompt,
+temperature and max_tokens. Entries expire after a TTL, and once the cache
+grows past its size cap the least recently used entries are evicted.
+Sampling at a high temperature is meant to give a new answer every time,
+so those requests bypass the cache automatically.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.getenv("RABINDRAGPT_RESPONSE_CACHE", ".cache/responses.sqlite")
+# Requests above this temperature always go to the model
+CACHE_MAX_TEMPERATURE = float(os.getenv("RABINDRAGPT_CACHE_MAX_TEMPERATURE", "1.0"))
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def cache_key(model, prompt, temperature, max_tokens, variant=0):
+    """Stable hash of everything that determines a response.
+
+    `variant` tells apart the alternative responses of a batch request.
+    """
+    fields = {'model': model, 'prompt': prompt, 'temperature': round(float(temperature), 4), 'max_tokens': int(max_tokens)}
+    if variant:
+        fields['variant'] = int(variant)
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(temperature):
+    """High-temperature requests want a fresh sample, so they skip the cache"""
+    return temperature <= CACHE_MAX_TEMPERATURE
+
+
+class ResponseCache:
+    """SQLite-backed response store with TTL expiry and LRU eviction"""
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        # WAL lets several app processes read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, model, prompt, temperature, max_tokens, variant=0):
+        """Cached response text, or None on a miss or an expired entry"""
+        key = cache_key(model, prompt, temperature, max_tokens, variant)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, model, prompt, temperature, max_tokens, response, variant=0):
+        """Store a response and evict expired and least recently used entries"""
+        key = cache_key(model, prompt, temperature, max_tokens, variant)
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, last_used, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, response, now, now, size),
+                )
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk from least recently used until both caps are met
+        excess_count = max(count - self.max_entries, 0)
+        excess_bytes = max(total - self.max_bytes, 0)
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if excess_count <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            excess_count -= 1
+            excess_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+
+def get_response_cache():
+    """Process-wide response cache, or None if the cache file can't be opened"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache()
+            except (OSError, sqlite3.Error):
+                return None
+        return _cache
@@ -0,0 +1,112 @@
+"""Reference-song retrieval for lyrics generation.
+
+Picks the songs most relevant to a requested theme, raga and tala from the
+combined corpus and packs their lyrics into a prompt under a token budget.
+Raga and tala lookups use the per-value document ID arrays from facets,
+the theme is ranked with the lyrics BM25 index, and whole retrievals are
+memoized, so a generation request spends its time in the model call
+rather than in DataFrame filtering.
+"""
+
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from bengali_text import normalize_text
+from facets import RAGA, TALA, value_ids
+from lyrics_index import load_lyrics_index, tokenize
+
+# Weights of an exact raga / tala match relative to the best theme match (1.0)
+RAGA_WEIGHT = 2.0
+TALA_WEIGHT = 1.0
+# Score of a song whose lyrics contain the theme only inside longer words,
+# which BM25 (whole tokens only) scores as 0
+SUBSTRING_THEME_SCORE = 0.1
+
+# Rough size of Bengali text in model tokens; errs on the generous side
+CHARS_PER_TOKEN = 2
+
+# Corpus version the memoized retrievals belong to
+_cached_version = None
+_cached_version_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used for the prompt budget"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def retrieve_reference_ids(combined, theme="", raga="", tala="", k=3, doc_range=None):
+    """IDs of the k songs that best fit the theme, raga and tala, best first"""
+    global _cached_version
+    with _cached_version_lock:
+        # Cached entries hold their corpus, so drop them all once it is rebuilt
+        if _cached_version != combined.version:
+            _retrieve_cached.cache_clear()
+            _cached_version = combined.version
+    return _retrieve_cached(combined.version, combined, normalize_text(theme), raga or "", tala or "", k, doc_range)
+
+
+@lru_cache(maxsize=512)
+def _retrieve_cached(version, combined, theme, raga, tala, k, doc_range):
+    n_docs = len(combined.frame)
+    start, stop = doc_range if doc_range is not None else (0, n_docs)
+    scores = np.zeros(n_docs)
+    matched = np.zeros(n_docs, dtype=bool)
+
+    if raga:
+        ids = value_ids(combined, RAGA).get(raga, np.zeros(0, dtype=np.int64))
+        scores[ids] += RAGA_WEIGHT
+        matched[ids] = True
+    if tala:
+        ids = value_ids(combined, TALA).get(tala, np.zeros(0, dtype=np.int64))
+        scores[ids] += TALA_WEIGHT
+        matched[ids] = True
+    if theme:
+        # Any theme word may match; BM25 decides which songs fit best
+        query = " OR ".join(tokenize(theme))
+        ids, theme_scores = load_lyrics_index(combined).scored_search(query, (start, stop))
+        if len(ids):
+            best_score = theme_scores.max()
+            if best_score > 0:
+                theme_scores = theme_scores / best_score
+            scores[ids] += np.where(theme_scores > 0, theme_scores, SUBSTRING_THEME_SCORE)
+            matched[ids] = True
+
+    matched[:start] = False
+    matched[stop:] = False
+    candidates = np.flatnonzero(matched)
+    # Stable sort keeps corpus order among equal scores
+    best = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+    best.setflags(write=False)
+    return best
+
+
+def pack_references(lyrics_list, max_tokens):
+    """Join reference lyrics into one prompt block that fits within max_tokens.
+
+    Songs are added whole while they fit; the first one that doesn't is cut
+    at a line boundary, and everything after it is dropped.
+    """
+    blocks, used = [], 0
+    for number, lyrics in enumerate(lyrics_list, 1):
+        if not isinstance(lyrics, str) or not lyrics.strip():
+            continue
+        header = f"[{number}]\n"
+        remaining = max_tokens - used - estimate_tokens(header)
+        if remaining <= 0:
+            break
+        if estimate_tokens(lyrics) <= remaining:
+            blocks.append(header + lyrics.strip())
+            used += estimate_tokens(header + lyrics.strip())
+            continue
+        kept = []
+        for line in lyrics.strip().splitlines():
+            if estimate_tokens("\n".join(kept + [line])) > remaining:
+                break
+            kept.append(line)
+        if kept:
+            blocks.append(header + "\n".join(kept))
+        break
+    return "\n\n".join(blocks)
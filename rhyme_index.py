@@ -0,0 +1,188 @@
+"""Reversed-suffix index over the rhyme dictionary.
+
+Tokens are split into aksharas (see bengali_text), each distinct akshara is
+given a one-character key, and the key strings are stored reversed and
+sorted. Every token that shares a suffix of aksharas with the query then sits
+in one contiguous block, so a longest-common-suffix lookup is a handful of
+binary searches plus a walk over the blocks closest to the query.
+"""
+
+import os
+import pickle
+import threading
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from bengali_text import segment_aksharas, split_aksharas
+
+INDEX_VERSION = 3
+
+# Akshara keys are taken from the supplementary private use planes
+_KEY_BASE = 0xF0000
+
+# Sorts after every akshara key, used to find the end of a prefix block
+_PREFIX_END = "\U0010ffff"
+
+# Loaded indexes shared by every session in the process, keyed by dictionary path
+_loaded_indexes = {}
+_loaded_lock = threading.Lock()
+
+
+def suffix_index_path(dictionary_path):
+    """Path of the suffix index stored next to the dictionary pickle"""
+    root, _ = os.path.splitext(dictionary_path)
+    return f"{root}_suffix.pkl"
+
+
+class SuffixIndex:
+    """Sorted array of reversed akshara keys for the dictionary tokens.
+
+    Akshara boundaries are kept as flat arrays: token i owns the character
+    offsets akshara_offsets[akshara_starts[i]:akshara_starts[i + 1]].
+    """
+
+    def __init__(self, reversed_keys, tokens, akshara_counts, akshara_starts,
+                 akshara_offsets, positions, akshara_keys):
+        self.reversed_keys = reversed_keys
+        self.tokens = tokens
+        self.akshara_counts = akshara_counts
+        self.akshara_starts = akshara_starts
+        self.akshara_offsets = akshara_offsets
+        self.positions = positions
+        self.akshara_keys = akshara_keys
+
+    @classmethod
+    def build(cls, tokens_df):
+        """Build the index from a dictionary DataFrame with a token column"""
+        # NFC on both sides, as for lyrics search: dictionaries built before
+        # build_corpus normalized them still hold precomposed য়, ড়, ঢ়
+        tokens = tokens_df['token'].astype(str).str.strip().map(lambda token: unicodedata.normalize("NFC", token))
+        keep = (tokens != "") & (tokens != "nan")
+        tokens = tokens[keep]
+        positions = np.flatnonzero(keep.to_numpy())
+
+        aksharas, starts, char_offsets = segment_aksharas(tokens)
+        codes, uniques = pd.factorize(aksharas)
+        akshara_keys = {akshara: chr(_KEY_BASE + code) for code, akshara in enumerate(uniques)}
+        key_chars = [chr(_KEY_BASE + code) for code in codes]
+        reversed_keys = [
+            "".join(reversed(key_chars[starts[i]:starts[i + 1]]))
+            for i in range(len(tokens))
+        ]
+        counts = np.diff(starts).astype(np.int32)
+
+        order = np.array(sorted(range(len(reversed_keys)), key=reversed_keys.__getitem__), dtype=np.int64)
+        token_list = tokens.tolist()
+        sorted_counts = counts[order]
+        sorted_starts = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(sorted_counts, out=sorted_starts[1:])
+        # Gather each token's akshara offsets into sorted order in one pass
+        within = np.arange(sorted_starts[-1]) - np.repeat(sorted_starts[:-1], sorted_counts)
+        sorted_offsets = char_offsets[np.repeat(starts[:-1][order], sorted_counts) + within]
+
+        return cls(
+            [reversed_keys[i] for i in order],
+            [token_list[i] for i in order],
+            sorted_counts,
+            sorted_starts,
+            sorted_offsets,
+            positions[order],
+            akshara_keys,
+        )
+
+    def _block(self, reversed_prefix):
+        """Return the [lo, hi) range of tokens whose reversed key starts with the prefix"""
+        lo = bisect_left(self.reversed_keys, reversed_prefix)
+        hi = bisect_left(self.reversed_keys, reversed_prefix + _PREFIX_END, lo)
+        return lo, hi
+
+    def _query_key(self, query_word):
+        """Reversed akshara key of the query; unknown aksharas get a key no token has"""
+        missing = chr(_KEY_BASE + len(self.akshara_keys))
+        return "".join(self.akshara_keys.get(akshara, missing) for akshara in reversed(split_aksharas(query_word)))
+
+    def _suffix(self, i, suffix_length):
+        """Last `suffix_length` aksharas of token i"""
+        start = self.akshara_offsets[self.akshara_starts[i] + self.akshara_counts[i] - suffix_length]
+        return self.tokens[i][start:]
+
+    def find_matches(self, query_word, top_n=20):
+        """Top-N tokens by longest common suffix, then by token length.
+
+        Both lengths are counted in aksharas. Ties keep dictionary order.
+        """
+        query_word = unicodedata.normalize("NFC", query_word.strip())
+        if query_word == "" or top_n <= 0:
+            return []
+
+        reversed_query = self._query_key(query_word)
+        matches = []
+
+        # Walk from the longest shared suffix down; each step only adds the
+        # tokens that share exactly `suffix_length` aksharas with the query.
+        inner = None
+        for suffix_length in range(len(reversed_query), 0, -1):
+            lo, hi = self._block(reversed_query[:suffix_length])
+            inner_lo, inner_hi = inner if inner else (lo, lo)
+            if hi > lo:
+                band = np.concatenate((np.arange(lo, inner_lo), np.arange(inner_hi, hi)))
+                band = band[np.lexsort((self.positions[band], -self.akshara_counts[band]))]
+                for i in band:
+                    token = self.tokens[i]
+                    if token == query_word:
+                        continue
+                    matches.append({
+                        'token': token,
+                        'token_length': int(self.akshara_counts[i]),
+                        'suffix_length': suffix_length,
+                        'suffix': self._suffix(i, suffix_length)
+                    })
+                    if len(matches) >= top_n:
+                        return matches
+            inner = (lo, hi)
+
+        return matches
+
+
+def load_suffix_index(dictionary_path, tokens_df):
+    """Load the persisted suffix index, rebuilding it when the dictionary changed"""
+    try:
+        source_mtime = os.path.getmtime(dictionary_path)
+    except OSError:
+        source_mtime = None
+
+    with _loaded_lock:
+        cached = _loaded_indexes.get(dictionary_path)
+        if cached is not None and source_mtime is not None and cached[0] == source_mtime:
+            return cached[1]
+        index = _read_or_build_index(dictionary_path, source_mtime, tokens_df)
+        _loaded_indexes[dictionary_path] = (source_mtime, index)
+        return index
+
+
+def _read_or_build_index(dictionary_path, source_mtime, tokens_df):
+    index_path = suffix_index_path(dictionary_path)
+    if source_mtime is not None and os.path.exists(index_path):
+        try:
+            with open(index_path, "rb") as f:
+                payload = pickle.load(f)
+            if payload.get('version') == INDEX_VERSION and payload.get('source_mtime') == source_mtime:
+                return payload['index']
+        except Exception:
+            pass
+
+    index = SuffixIndex.build(tokens_df)
+
+    if source_mtime is not None:
+        try:
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({'version': INDEX_VERSION, 'source_mtime': source_mtime, 'index': index}, f)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass
+
+    return index
@@ -0,0 +1,185 @@
+"""Semantic (embedding) search over the combined song corpus.
+
+Every song is embedded offline with a local multilingual sentence encoder
+running on CPU, and the unit-length vectors are saved as a float16 matrix
+that is memory-mapped at runtime. A query is embedded with the same model
+and answered with one matrix-vector product over the mapped matrix.
+
+Nothing here touches the network: the model is loaded with
+`local_files_only`, so it must already be in the Hugging Face cache or in a
+local directory named by RABINDRAGPT_EMBEDDING_MODEL. Build the index with
+
+    python semantic_index.py
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+INDEX_VERSION = 1
+
+EMBEDDING_MODEL = os.getenv("RABINDRAGPT_EMBEDDING_MODEL", "intfloat/multilingual-e5-small")
+EMBEDDINGS_PATH = "songs/lyrics_embeddings.npy"
+METADATA_PATH = "songs/lyrics_embeddings.json"
+
+# The e5 family expects these prefixes on passages and queries
+_PASSAGE_PREFIX = "passage: "
+_QUERY_PREFIX = "query: "
+_MAX_TOKENS = 512
+_BATCH_SIZE = 16
+# Rows scored per block, so the float32 upcast of the matrix stays small
+_SCORE_BLOCK = 8192
+
+_encoder = None
+_encoder_lock = threading.Lock()
+# (corpus version, metadata mtime) -> SemanticIndex, or None when no usable index is on disk
+_loaded_indexes = {}
+_loaded_lock = threading.Lock()
+
+
+class LocalEncoder:
+    """Mean-pooled sentence embeddings from a local transformers checkpoint"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        # Heavy imports stay here so the app only pays for them in semantic mode
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=True)
+        self.model = AutoModel.from_pretrained(model_name, local_files_only=True)
+        self.model.eval()
+
+    def encode(self, texts, batch_size=_BATCH_SIZE):
+        """Unit-length float32 embeddings, one row per text"""
+        vectors = []
+        with self.torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                batch = self.tokenizer(
+                    texts[start:start + batch_size],
+                    padding=True,
+                    truncation=True,
+                    max_length=_MAX_TOKENS,
+                    return_tensors="pt",
+                )
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = self.torch.nn.functional.normalize(pooled, dim=-1)
+                vectors.append(pooled.numpy().astype(np.float32))
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(vectors)
+
+
+def get_encoder():
+    """Process-wide encoder, loaded on first use"""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = LocalEncoder()
+        return _encoder
+
+
+def corpus_fingerprint(frame):
+    """Hash of the song IDs and lyrics the embeddings were computed from"""
+    digest = hashlib.sha1()
+    if frame.empty:
+        return digest.hexdigest()
+    for song_id, lyrics in zip(frame['song_id'], frame['lyrics']):
+        # Missing lyrics hash the same whether the corpus came from a pickle or an Arrow file
+        lyrics = lyrics if isinstance(lyrics, str) else ""
+        digest.update(f"{song_id}\0{lyrics}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SemanticIndex:
+    """Memory-mapped float16 embedding matrix aligned with the combined corpus rows"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def search(self, query, top_k=50, doc_range=None):
+        """Document IDs of the top_k songs closest in meaning to the query, best first"""
+        query = query.strip()
+        if not query or len(self.embeddings) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        query_vector = get_encoder().encode([_QUERY_PREFIX + query])[0]
+        start, stop = doc_range if doc_range is not None else (0, len(self.embeddings))
+        scores = np.empty(max(stop - start, 0), dtype=np.float32)
+        for block in range(start, stop, _SCORE_BLOCK):
+            block_stop = min(block + _SCORE_BLOCK, stop)
+            scores[block - start:block_stop - start] = self.embeddings[block:block_stop].astype(np.float32) @ query_vector
+
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return (best + start).astype(np.int64)
+
+
+def build_semantic_index(combined, embeddings_path=EMBEDDINGS_PATH, metadata_path=METADATA_PATH):
+    """Embed every song in the combined corpus and save the matrix next to the corpora"""
+    frame = combined.frame
+    lyrics = [_PASSAGE_PREFIX + (text if isinstance(text, str) else "") for text in frame['lyrics']]
+    embeddings = get_encoder().encode(lyrics).astype(np.float16)
+
+    tmp_path = f"{embeddings_path}.tmp.npy"
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, embeddings_path)
+
+    metadata = {
+        'version': INDEX_VERSION,
+        'model': EMBEDDING_MODEL,
+        'fingerprint': corpus_fingerprint(frame),
+        'shape': list(embeddings.shape),
+    }
+    tmp_path = f"{metadata_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    os.replace(tmp_path, metadata_path)
+
+
+def load_semantic_index(combined, embeddings_path=EMBEDDINGS_PATH, metadata_path=METADATA_PATH):
+    """Memory-map the saved embeddings, or return None if they are missing or stale"""
+    try:
+        metadata_mtime = os.path.getmtime(metadata_path)
+    except OSError:
+        metadata_mtime = None
+    key = (combined.version, metadata_mtime)
+
+    with _loaded_lock:
+        if key in _loaded_indexes:
+            return _loaded_indexes[key]
+
+        index = None
+        try:
+            with open(metadata_path, encoding="utf-8") as f:
+                metadata = json.load(f)
+            if (metadata.get('version') == INDEX_VERSION
+                    and metadata.get('model') == EMBEDDING_MODEL
+                    and metadata.get('fingerprint') == corpus_fingerprint(combined.frame)):
+                index = SemanticIndex(np.load(embeddings_path, mmap_mode="r"))
+        except (OSError, ValueError):
+            index = None
+
+        _loaded_indexes[key] = index
+        return index
+
+
+def main():
+    from lyricists import load_combined
+
+    combined = load_combined()
+    build_semantic_index(combined)
+    print(f"Embedded {len(combined.frame)} songs with {EMBEDDING_MODEL} into {EMBEDDINGS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
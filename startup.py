@@ -0,0 +1,77 @@
+"""Process-wide state for the top of app.py.
+
+Streamlit re-executes app.py on every interaction, so anything the script
+computes at the top is recomputed on every rerun. The static images are
+read and encoded once per process here, keyed by file mtime, and the time
+the script spends importing its modules is recorded so that a slow new
+import shows up in the admin panel.
+"""
+
+import os
+import threading
+
+# (path, mtime) -> base64 text of a static file
+_encoded = {}
+# (path, mtime) -> PIL image for the page icon
+_icons = {}
+_assets_lock = threading.Lock()
+
+# First (cold) and most recent time spent importing app.py's modules
+_import_times = {}
+_import_times_lock = threading.Lock()
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def image_base64(path):
+    """Base64 text of a static image, or None if it can't be read"""
+    key = (path, _mtime(path))
+    if key[1] is None:
+        return None
+    with _assets_lock:
+        if key not in _encoded:
+            import base64
+
+            try:
+                with open(path, "rb") as f:
+                    _encoded[key] = base64.b64encode(f.read()).decode()
+            except OSError:
+                return None
+        return _encoded[key]
+
+
+def page_icon(path, default):
+    """The image at `path` for st.set_page_config, or `default` if it is missing"""
+    key = (path, _mtime(path))
+    if key[1] is None:
+        return default
+    with _assets_lock:
+        if key not in _icons:
+            # PIL is only needed for this one image
+            from PIL import Image
+
+            try:
+                image = Image.open(path)
+                image.load()
+            except OSError:
+                image = default
+            _icons[key] = image
+        return _icons[key]
+
+
+def record_import_time(seconds):
+    """Record how long one run of app.py spent on its imports"""
+    with _import_times_lock:
+        _import_times.setdefault('cold', seconds)
+        _import_times['last'] = seconds
+
+
+def import_times():
+    """{'cold': seconds on the first run in this process, 'last': seconds on the latest run}"""
+    with _import_times_lock:
+        return dict(_import_times)
@@ -0,0 +1,127 @@
+"""Startup warm-up of the corpora and indexes.
+
+Without it, whichever request first touches the song data pays for loading
+every corpus, the dictionary and their indexes one after another. The
+warm-up starts all of them on a thread pool as soon as the app process
+starts; artifacts that depend on another one (the lyrics index on the
+combined corpus, the suffix index on the dictionary) start as soon as that
+one is loaded.
+
+Everything goes through the same process-wide caches the app uses, so the
+warm-up only decides *when* things load. A request that arrives early waits
+on the one artifact it needs via `wait`, and `status` reports what is ready.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from corpus import LOAD_WORKERS, get_corpus
+from facets import FACET_COLUMNS, document_years, get_facet_table, value_ids
+from lyricists import get_registry, load_combined
+from lyrics_index import load_lyrics_index
+from rhyme_index import load_suffix_index
+from semantic_index import load_semantic_index
+
+CORPORA = "corpora"
+DICTIONARY = "dictionary"
+LYRICS_INDEX = "lyrics index"
+SUFFIX_INDEX = "rhyme index"
+FACETS = "facets"
+SEMANTIC_INDEX = "semantic index"
+ARTIFACTS = (CORPORA, DICTIONARY, LYRICS_INDEX, SUFFIX_INDEX, FACETS, SEMANTIC_INDEX)
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def _warm_facets(combined):
+    for column in FACET_COLUMNS:
+        value_ids(combined, column)
+    document_years(combined)
+    get_facet_table(combined)
+    for doc_range in combined.ranges.values():
+        get_facet_table(combined, doc_range)
+
+
+class Warmup:
+    """One warm-up run: a future and a load time per artifact"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.started = time.time()
+        # artifact -> seconds from start until it was loaded
+        self.timings = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(LOAD_WORKERS, len(ARTIFACTS)), thread_name_prefix="warmup")
+        self._futures = {}
+
+    def start(self):
+        dictionary_path = self.registry.dictionary.corpus
+        corpora = self._submit(CORPORA, lambda: load_combined(self.registry))
+        dictionary = self._submit(DICTIONARY, lambda: get_corpus(dictionary_path))
+        self._submit(LYRICS_INDEX, lambda: load_lyrics_index(corpora.result()))
+        self._submit(SUFFIX_INDEX, lambda: load_suffix_index(dictionary_path, dictionary.result()))
+        self._submit(FACETS, lambda: _warm_facets(corpora.result()))
+        self._submit(SEMANTIC_INDEX, lambda: load_semantic_index(corpora.result()))
+        # Threads exit once the queue drains; the futures keep the results
+        self._pool.shutdown(wait=False)
+        return self
+
+    def _submit(self, artifact, load):
+        def run():
+            result = load()
+            self.timings[artifact] = time.time() - self.started
+            return result
+
+        future = self._futures[artifact] = self._pool.submit(run)
+        return future
+
+    def ready(self, artifact):
+        future = self._futures.get(artifact)
+        return future is None or future.done()
+
+    def wait(self, artifact, timeout=None):
+        """Block until an artifact has finished loading; False if it failed or timed out.
+
+        Failures are not raised here: the caller's own load reports them.
+        """
+        future = self._futures.get(artifact)
+        if future is None:
+            return True
+        try:
+            future.result(timeout)
+        except Exception:
+            return False
+        return True
+
+    def status(self):
+        """{artifact: 'loading' | 'ready' | 'failed'}"""
+        states = {}
+        for artifact, future in self._futures.items():
+            if not future.done():
+                states[artifact] = "loading"
+            else:
+                states[artifact] = "failed" if future.exception() is not None else "ready"
+        return states
+
+
+def start_warmup():
+    """Start the process-wide warm-up once; later calls return the same run"""
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = Warmup(get_registry()).start()
+        return _warmup
+
+
+def wait(artifact, timeout=None):
+    """Wait for one artifact of the running warm-up; returns at once if none was started"""
+    return _warmup.wait(artifact, timeout) if _warmup is not None else True
+
+
+def ready(artifact):
+    return _warmup is None or _warmup.ready(artifact)
+
+
+def status():
+    return _warmup.status() if _warmup is not None else {}